@@ -1,75 +1,523 @@
 # app.py
 import os
-import io
+import sys
+import hashlib
+import json
+import multiprocessing
 import re
 import time
+import queue
 import uuid
 import zipfile
 import shutil
+import sqlite3
 import tempfile
+import threading
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Tuple, Optional
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Set, Tuple, TypeVar, Optional, Union
+
+# Startzeit für die Startup-Logzeile (Import von Flask/PIL/... mitgemessen)
+_IMPORT_T0 = time.perf_counter()
 
 from flask import Flask, request, send_file, jsonify, render_template, Response, stream_with_context
 
-from PIL import Image
+from PIL import Image, ImageFilter
 import pytesseract
 
-# Optional: PDF -> Images
-_IMAGES_FROM_PDF_BACKEND = None
+# Optional: tesserocr (libtesseract-API im Prozess statt tesseract-Aufruf je Seite)
+_TESSEROCR = None
 try:
-    from pdf2image import convert_from_bytes  # requires poppler
-    _IMAGES_FROM_PDF_BACKEND = "pdf2image"
+    import tesserocr
+    _TESSEROCR = tesserocr
 except Exception:
-    try:
-        import fitz  # PyMuPDF
-        _IMAGES_FROM_PDF_BACKEND = "pymupdf"
-    except Exception:
-        _IMAGES_FROM_PDF_BACKEND = None
+    _TESSEROCR = None
 
-# Optional: spaCy NER (für bessere Personen/Orts-Erkennung)
+app = Flask(__name__, template_folder="templates", static_folder="static")
+
+# Rasterauflösung für PDF-Seiten (Teil des OCR-Cache-Schlüssels)
+PDF_RENDER_DPI = 300
+# Wie viele gerasterte PDF-Seiten höchstens gleichzeitig im Speicher liegen (serielle OCR)
+PDF_PAGE_WINDOW = int(os.environ.get("PDF_PAGE_WINDOW", "4"))
+# Anzahl OCR-Prozesse (1 = seriell im Request-Prozess) und Tesseract-Threads je Prozess
+OCR_WORKERS = int(os.environ.get("OCR_WORKERS", "0")) or (os.cpu_count() or 1)
+OCR_THREADS_PER_WORKER = os.environ.get("OCR_THREADS_PER_WORKER", "1")
+# OCR-Backend: 'auto' (tesserocr falls installiert), 'tesserocr' oder 'pytesseract'
+OCR_BACKEND = os.environ.get("OCR_BACKEND", "auto")
+# Persistenter OCR-Cache (Datei-Hash + Seite + dpi + Sprache + Config → Text), LRU-begrenzt; 0 MB = aus
+OCR_CACHE_DIR = Path(os.environ.get("OCR_CACHE_DIR", "cache/ocr"))
+OCR_CACHE_MAX_MB = int(os.environ.get("OCR_CACHE_MAX_MB", "512"))
+# Bildvorverarbeitung vor der OCR (pro Job via Formularfeld preprocess / target_dpi)
+OCR_PREPROCESS = os.environ.get("OCR_PREPROCESS", "gray")
+OCR_TARGET_DPI = int(os.environ.get("OCR_TARGET_DPI", "300"))
+# PDF-Seiten mit brauchbarer Textebene direkt übernehmen statt OCR (0 = immer OCR)
+PDF_TEXT_LAYER = os.environ.get("PDF_TEXT_LAYER", "1").lower() not in ("0", "false", "no", "off")
+TEXT_LAYER_MIN_CHARS = int(os.environ.get("TEXT_LAYER_MIN_CHARS", "80"))
+# Hintergrund-Jobs: parallel laufende Jobs, Warteschlangenlänge, Aufbewahrung fertiger Jobs (s)
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "2"))
+JOB_QUEUE_DEPTH = int(os.environ.get("JOB_QUEUE_DEPTH", "16"))
+JOB_RESULT_TTL = int(os.environ.get("JOB_RESULT_TTL", "86400"))
+# Kompression des Ergebnis-ZIPs: 0 = STORED, 1–9 = DEFLATE-Stufe (pro Job via Formularfeld zip_level)
+ZIP_COMPRESSLEVEL = int(os.environ.get("ZIP_COMPRESSLEVEL", "6"))
+# Uploads werden blockweise nach UPLOAD_DIR gespoolt statt in den Speicher gelesen; Obergrenze in MB (0 = keine)
+UPLOAD_DIR = Path(os.environ.get("UPLOAD_DIR", os.path.join(tempfile.gettempdir(), "ocr-extractor-uploads")))
+UPLOAD_MAX_MB = int(os.environ.get("UPLOAD_MAX_MB", "2048"))
+UPLOAD_CHUNK = 1024 * 1024
+if UPLOAD_MAX_MB > 0:
+    # Werkzeug lehnt größere Requests schon vor dem Lesen ab (1 MB Luft für die übrigen Formularfelder)
+    app.config["MAX_CONTENT_LENGTH"] = (UPLOAD_MAX_MB + 1) * 1024 * 1024
+# spaCy: Abschnitte je nlp.pipe-Batch, Prozesse für die NER
+SPACY_BATCH_SIZE = int(os.environ.get("SPACY_BATCH_SIZE", "32"))
+SPACY_N_PROCESS = int(os.environ.get("SPACY_N_PROCESS", "1"))
+SPACY_UNUSED_COMPONENTS = ("lemmatizer",)
+SPACY_MODEL = os.environ.get("SPACY_MODEL", "de_core_news_sm")
+# NER-Modell und PDF-Backend schon beim Import laden (z. B. gunicorn --preload:
+# einmal im Master, per fork/copy-on-write mit allen Workern geteilt)
+PRELOAD_MODELS = os.environ.get("PRELOAD_MODELS", "0") == "1"
+
+# --- Optionale Abhängigkeiten (lazy) ----------------------------------------
+
+# PDF -> Images und spaCy werden erst beim ersten Gebrauch geladen, damit
+# Worker und Pool-Prozesse, die sie nie brauchen, schnell und schlank starten.
+_LAZY_LOCK = threading.Lock()
+_IMAGES_FROM_PDF_BACKEND: Optional[str] = None
+_PDF_BACKEND_CHECKED = False
 _SPACY_NLP = None
-try:
-    import spacy
-    _SPACY_NLP = spacy.load("de_core_news_sm")
-except Exception:
-    _SPACY_NLP = None
+_SPACY_CHECKED = False
+
+def _pdf_backend() -> Optional[str]:
+    """'pdf2image' (benötigt Poppler), 'pymupdf' oder None."""
+    global _IMAGES_FROM_PDF_BACKEND, _PDF_BACKEND_CHECKED
+    if not _PDF_BACKEND_CHECKED:
+        with _LAZY_LOCK:
+            if not _PDF_BACKEND_CHECKED:
+                try:
+                    import pdf2image  # requires poppler
+                    _IMAGES_FROM_PDF_BACKEND = "pdf2image"
+                except Exception:
+                    try:
+                        import fitz  # PyMuPDF
+                        _IMAGES_FROM_PDF_BACKEND = "pymupdf"
+                    except Exception:
+                        _IMAGES_FROM_PDF_BACKEND = None
+                _PDF_BACKEND_CHECKED = True
+    return _IMAGES_FROM_PDF_BACKEND
+
+def _get_spacy_nlp():
+    """spaCy-Modell (für bessere Personen/Orts-Erkennung) oder None, wenn nicht installiert."""
+    global _SPACY_NLP, _SPACY_CHECKED
+    if not _SPACY_CHECKED:
+        with _LAZY_LOCK:
+            if not _SPACY_CHECKED:
+                try:
+                    import spacy
+                    _SPACY_NLP = _configure_spacy(spacy.load(SPACY_MODEL))
+                except Exception:
+                    _SPACY_NLP = None
+                _SPACY_CHECKED = True
+    return _SPACY_NLP
 
-app = Flask(__name__, template_folder="templates", static_folder="static")
 
 # --- Fortschritt / ETA --------------------------------------------------------
 
-# Sehr einfache globale Fortschrittsverfolgung pro Job
-PROGRESS: Dict[str, Dict[str, float]] = {}
-# Struktur:
-# PROGRESS[job_id] = {
-#   "total": int, "done": int, "start": epoch_seconds, "eta": float, "message": str
-# }
+# Fortschritt pro Job; Struktur:
+# {"total": int, "done": int, "start": epoch_seconds, "eta": float, "message": str}
+# Backend über PROGRESS_BACKEND: 'memory' (pro Prozess) oder 'sqlite'
+# (PROGRESS_DB, geteilt zwischen allen Worker-Prozessen). Einträge, die
+# länger als PROGRESS_TTL Sekunden nicht aktualisiert wurden, werden verworfen.
+PROGRESS_BACKEND = os.environ.get("PROGRESS_BACKEND", "memory")
+PROGRESS_DB = os.environ.get("PROGRESS_DB", "cache/progress.sqlite3")
+PROGRESS_TTL = int(os.environ.get("PROGRESS_TTL", "86400"))
+
+class ProgressStore(ABC):
+    """Atomares Lesen/Schreiben der Fortschritts-Dicts; Basis für die Backends."""
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    def put(self, job_id: str, p: dict) -> None:
+        ...
+
+    @abstractmethod
+    def update(self, job_id: str, fn: Callable[[dict], None]) -> Optional[dict]:
+        """
+        Wendet fn auf den Eintrag an (falls vorhanden) – als eine atomare
+        Operation – und gibt eine Kopie des neuen Stands zurück.
+        """
+
+class MemoryProgressStore(ProgressStore):
+
+    def __init__(self, ttl: int):
+        super().__init__(ttl)
+        self.data: Dict[str, dict] = {}
+        self.updated: Dict[str, float] = {}
+        self.lock = threading.Lock()
+
+    def _evict(self, now: float) -> None:
+        cutoff = now - self.ttl
+        for job_id in [j for j, t in self.updated.items() if t < cutoff]:
+            self.data.pop(job_id, None)
+            self.updated.pop(job_id, None)
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self.lock:
+            p = self.data.get(job_id)
+            return dict(p) if p else None
+
+    def put(self, job_id: str, p: dict) -> None:
+        now = time.time()
+        with self.lock:
+            self._evict(now)
+            self.data[job_id] = dict(p)
+            self.updated[job_id] = now
+
+    def update(self, job_id: str, fn: Callable[[dict], None]) -> Optional[dict]:
+        with self.lock:
+            p = self.data.get(job_id)
+            if p is None:
+                return None
+            fn(p)
+            self.updated[job_id] = time.time()
+            return dict(p)
+
+class SQLiteProgressStore(ProgressStore):
+
+    def __init__(self, ttl: int, path: str):
+        super().__init__(ttl)
+        self.path = path
+        self.local = threading.local()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS progress (job_id TEXT PRIMARY KEY, data TEXT NOT NULL, updated REAL NOT NULL)"
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        # eine Verbindung pro Thread; Transaktionen explizit (BEGIN IMMEDIATE)
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self.local.conn = conn
+        return conn
+
+    def get(self, job_id: str) -> Optional[dict]:
+        row = self._conn().execute(
+            "SELECT data FROM progress WHERE job_id = ? AND updated >= ?", (job_id, time.time() - self.ttl)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, job_id: str, p: dict) -> None:
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM progress WHERE updated < ?", (now - self.ttl,))
+            conn.execute("INSERT OR REPLACE INTO progress VALUES (?, ?, ?)", (job_id, json.dumps(p), now))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def update(self, job_id: str, fn: Callable[[dict], None]) -> Optional[dict]:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT data FROM progress WHERE job_id = ?", (job_id,)).fetchone()
+            p = None
+            if row is not None:
+                p = json.loads(row[0])
+                fn(p)
+                conn.execute("UPDATE progress SET data = ?, updated = ? WHERE job_id = ?",
+                             (json.dumps(p), time.time(), job_id))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return p
+
+def _make_progress_store() -> ProgressStore:
+    if PROGRESS_BACKEND == "sqlite":
+        return SQLiteProgressStore(PROGRESS_TTL, PROGRESS_DB)
+    if PROGRESS_BACKEND != "memory":
+        raise RuntimeError(f"Unbekanntes PROGRESS_BACKEND: {PROGRESS_BACKEND}")
+    return MemoryProgressStore(PROGRESS_TTL)
+
+PROGRESS_STORE = _make_progress_store()
+
+def progress_view(p: Optional[dict]) -> dict:
+    """Antwortform von /api/progress (und der SSE-'progress'-Events)."""
+    if not p:
+        return {"percent": 0, "done": 0, "total": 0, "eta_seconds": 0, "message": "Warte auf Start…"}
+    percent = 0 if p["total"] == 0 else int(100 * p["done"] / max(1, p["total"]))
+    return {
+        "percent": percent,
+        "done": int(p["done"]),
+        "total": int(p["total"]),
+        "eta_seconds": round(p["eta"], 1),
+        "message": p.get("message", "")
+    }
+
+def _progress_publish(job_id: str, p: Optional[dict]):
+    if p is not None:
+        EVENTS.publish(job_id, "progress", progress_view(p))
 
 def _progress_init(job_id: str, total: int, message: str = "Starte…"):
-    PROGRESS[job_id] = {"total": total, "done": 0, "start": time.time(), "eta": 0.0, "message": message}
+    p = {"total": total, "done": 0, "start": time.time(), "eta": 0.0, "message": message}
+    PROGRESS_STORE.put(job_id, p)
+    _progress_publish(job_id, p)
 
 def _progress_step(job_id: str, inc: int = 1, message: Optional[str] = None):
-    p = PROGRESS.get(job_id)
-    if not p:
-        return
-    p["done"] = min(p["total"], p.get("done", 0) + inc)
-    # ETA aus gleitendem Durchschnitt
-    elapsed = max(0.001, time.time() - p["start"])
-    avg_per = elapsed / max(1, p["done"])
-    remaining = max(0, p["total"] - p["done"])
-    p["eta"] = remaining * avg_per
-    if message is not None:
-        p["message"] = message
+    def apply(p: dict):
+        p["done"] = min(p["total"], p.get("done", 0) + inc)
+        # ETA aus gleitendem Durchschnitt
+        elapsed = max(0.001, time.time() - p["start"])
+        avg_per = elapsed / max(1, p["done"])
+        remaining = max(0, p["total"] - p["done"])
+        p["eta"] = remaining * avg_per
+        if message is not None:
+            p["message"] = message
+    _progress_publish(job_id, PROGRESS_STORE.update(job_id, apply))
+
+def _progress_extend(job_id: str, steps: int):
+    """Weitere Arbeitsschritte nach den bereits erledigten einplanen."""
+    def apply(p: dict):
+        p["total"] = p["done"] + steps
+    _progress_publish(job_id, PROGRESS_STORE.update(job_id, apply))
 
 def _progress_finish(job_id: str, message: str = "Fertig."):
-    p = PROGRESS.get(job_id)
-    if not p:
-        return
-    p["done"] = p["total"]
-    p["eta"] = 0.0
-    p["message"] = message
+    def apply(p: dict):
+        p["done"] = p["total"]
+        p["eta"] = 0.0
+        p["message"] = message
+    _progress_publish(job_id, PROGRESS_STORE.update(job_id, apply))
+
+def _progress_stage(job_id: str, stage: str):
+    """Stufenwechsel melden: 'ocr', 'text', 'register', 'zip'."""
+    EVENTS.publish(job_id, "stage", {"stage": stage})
+
+# --- Job-Events (SSE) ---------------------------------------------------------
+
+# Sekunden zwischen Keep-alive-Kommentaren und max. gepufferte Events je Job
+SSE_HEARTBEAT = float(os.environ.get("SSE_HEARTBEAT", "15"))
+SSE_BACKLOG = int(os.environ.get("SSE_BACKLOG", "1000"))
+
+class JobEventBus:
+    """
+    Pro Job ein Kanal mit fortlaufend nummerierten Events. Streams warten
+    auf einer gemeinsamen Condition (wait_for mit eigenem Prädikat) und holen
+    alles ab, was seit ihrer letzten Event-ID (Last-Event-ID) veröffentlicht
+    wurde; ein Heartbeat kommt erst nach SSE_HEARTBEAT Sekunden ohne Event.
+    """
+
+    TERMINAL = ("done", "error", "cancelled")
+
+    def __init__(self, backlog: int, ttl: int):
+        self.backlog = backlog
+        self.ttl = ttl
+        # job_id -> {"next_id": int, "events": deque[(id, event, data)], "closed": bool, "updated": float}
+        self.channels: Dict[str, dict] = {}
+        self.cond = threading.Condition()
+
+    def _prune(self, now: float) -> None:
+        cutoff = now - self.ttl
+        for job_id in [j for j, ch in self.channels.items() if ch["updated"] < cutoff]:
+            del self.channels[job_id]
+
+    def publish(self, job_id: str, event: str, data: dict) -> None:
+        now = time.time()
+        with self.cond:
+            ch = self.channels.get(job_id)
+            if ch is None:
+                self._prune(now)
+                ch = self.channels[job_id] = {"next_id": 1, "events": deque(maxlen=self.backlog),
+                                              "closed": False, "updated": now}
+            ch["events"].append((ch["next_id"], event, data))
+            ch["next_id"] += 1
+            ch["updated"] = now
+            if event in self.TERMINAL:
+                ch["closed"] = True
+            self.cond.notify_all()
+
+    def reset(self, job_id: str) -> None:
+        """Neuer Job mit wiederverwendeter ID: alten Kanal verwerfen."""
+        with self.cond:
+            self.channels.pop(job_id, None)
+
+    def stream(self, job_id: str, last_id: int = 0) -> Iterator[Tuple[Optional[int], Optional[str], Optional[dict]]]:
+        """
+        Liefert (id, event, data) ab last_id, bis der Job beendet ist;
+        (None, None, None) signalisiert einen Heartbeat.
+        """
+        def ready() -> bool:
+            ch = self.channels.get(job_id)
+            return bool(ch) and (ch["closed"] or ch["next_id"] - 1 > last_id)
+
+        heartbeat_at = time.monotonic() + SSE_HEARTBEAT
+        while True:
+            with self.cond:
+                # Events anderer Jobs wecken zwar auf, zählen aber nicht: weiter
+                # warten bis zum eigenen Event oder zur Heartbeat-Frist
+                self.cond.wait_for(ready, max(0.0, heartbeat_at - time.monotonic()))
+                ch = self.channels.get(job_id)
+                pending = [e for e in ch["events"] if e[0] > last_id] if ch else []
+                closed = bool(ch and ch["closed"])
+            if not pending:
+                if closed:
+                    return
+                if time.monotonic() >= heartbeat_at:
+                    yield None, None, None
+                    heartbeat_at = time.monotonic() + SSE_HEARTBEAT
+                continue
+            for item in pending:
+                yield item
+                last_id = item[0]
+            heartbeat_at = time.monotonic() + SSE_HEARTBEAT
+
+def _sse_format(event_id: Optional[int], event: Optional[str], data) -> str:
+    if event is None:
+        return ": keep-alive\n\n"
+    payload = data if isinstance(data, str) else json.dumps(data, ensure_ascii=False)
+    return f"id: {event_id}\nevent: {event}\ndata: {payload}\n\n"
+
+EVENTS = JobEventBus(SSE_BACKLOG, JOB_RESULT_TTL)
+
+# --- Metriken ----------------------------------------------------------------
+
+# Prozesslokale Zähler/Summen für /metrics (Prometheus-Textformat). Mit
+# METRICS_ENABLED=0 sind inc/observe No-ops und /metrics antwortet mit 404.
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1").lower() not in ("0", "false", "no", "off")
+METRICS_PREFIX = "ocr_extractor_"
+
+class Metrics:
+
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        # name -> (typ, hilfetext); Reihenfolge = Ausgabereihenfolge
+        self.meta: Dict[str, Tuple[str, str]] = {}
+        # (name, labels) -> wert bzw. [anzahl, summe]
+        self.counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        self.summaries: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], List[float]] = {}
+        self.gauges: Dict[str, Callable[[], float]] = {}
+
+    def describe(self, name: str, kind: str, help_text: str) -> None:
+        self.meta[name] = (kind, help_text)
+
+    def gauge(self, name: str, fn: Callable[[], float], help_text: str) -> None:
+        """Momentanwert, erst beim Abruf von /metrics ermittelt."""
+        self.describe(name, "gauge", help_text)
+        self.gauges[name] = fn
+
+    def inc(self, name: str, value: float = 1.0, **labels: str) -> None:
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            entry = self.summaries.setdefault(key, [0, 0.0])
+            entry[0] += 1
+            entry[1] += value
+
+    def render(self) -> str:
+        def fmt_labels(labels) -> str:
+            if not labels:
+                return ""
+            return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+        with self.lock:
+            counters = dict(self.counters)
+            summaries = {k: list(v) for k, v in self.summaries.items()}
+        lines = []
+        for name, (kind, help_text) in self.meta.items():
+            full = METRICS_PREFIX + name
+            lines.append(f"# HELP {full} {help_text}")
+            lines.append(f"# TYPE {full} {kind}")
+            if kind == "gauge":
+                try:
+                    lines.append(f"{full} {float(self.gauges[name]())}")
+                except Exception:
+                    pass
+            elif kind == "counter":
+                lines.extend(f"{full}{fmt_labels(labels)} {value}"
+                             for (n, labels), value in sorted(counters.items()) if n == name)
+            else:
+                for (n, labels), (count, total) in sorted(summaries.items()):
+                    if n == name:
+                        lines.append(f"{full}_count{fmt_labels(labels)} {count}")
+                        lines.append(f"{full}_sum{fmt_labels(labels)} {total}")
+        return "\n".join(lines) + "\n"
+
+METRICS = Metrics(METRICS_ENABLED)
+METRICS.describe("jobs_total", "counter", "Beendete Jobs nach Status")
+METRICS.describe("job_seconds", "summary", "Laufzeit erfolgreicher Jobs (Sekunden)")
+METRICS.describe("stage_seconds", "summary", "Dauer je Pipeline-Stufe (Sekunden, ohne Teilschritte)")
+METRICS.describe("pages_total", "counter", "Verarbeitete Seiten nach Quelle (text_layer, checkpoint, cache, ocr)")
+METRICS.describe("ocr_page_seconds", "summary", "OCR-Dauer je Seite inkl. Vorverarbeitung (Sekunden)")
+
+class StageTimer:
+    """
+    Misst die Stufen eines Jobs. Jede Zeitspanne zählt genau einmal:
+    Teilschritte (step/iterate) werden aus der umgebenden Stufe
+    herausgerechnet, die Summe aller Einträge ist die Gesamtlaufzeit.
+    """
+
+    def __init__(self, stage: str = "read"):
+        self.timings: Dict[str, float] = {}
+        self.stage = stage
+        self.t0 = time.perf_counter()
+        self.nested = 0.0
+
+    def _add(self, name: str, secs: float) -> None:
+        self.timings[name] = self.timings.get(name, 0.0) + secs
+
+    def enter(self, stage: str) -> None:
+        now = time.perf_counter()
+        self._add(self.stage, now - self.t0 - self.nested)
+        self.stage, self.t0, self.nested = stage, now, 0.0
+
+    @contextmanager
+    def step(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            secs = time.perf_counter() - t0
+            self._add(name, secs)
+            self.nested += secs
+
+    def iterate(self, name: str, iterable: Iterable):
+        """Zeit in next() eines Generators (z. B. Rasterung) als Teilschritt zählen."""
+        it = iter(iterable)
+        while True:
+            with self.step(name):
+                try:
+                    item = next(it)
+                except StopIteration:
+                    return
+            yield item
+
+    def report(self) -> Dict[str, float]:
+        """Gerundete Dauer je Stufe; meldet sie zugleich an METRICS."""
+        for name, secs in self.timings.items():
+            METRICS.observe("stage_seconds", secs, stage=name)
+        return {name: round(secs, 3) for name, secs in self.timings.items()}
 
 # --- Utility -----------------------------------------------------------------
 
@@ -96,15 +544,79 @@ def secure_folder_name(name: str) -> str:
     s = re.sub(r"[^a-zA-Z0-9_\- ]+", "", name).strip().replace(" ", "_")
     return s or f"werk_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
 
+class UploadTooLarge(Exception):
+    pass
+
+def spool_upload(f) -> Path:
+    """
+    Schreibt den Upload blockweise (UPLOAD_CHUNK) nach UPLOAD_DIR und
+    liefert den Pfad – der Speicherbedarf bleibt unabhängig von der
+    Dateigröße. Über UPLOAD_MAX_MB → UploadTooLarge (auch ohne Content-Length).
+    """
+    ensure_dir(UPLOAD_DIR)
+    limit = UPLOAD_MAX_MB * 1024 * 1024
+    fd, name = tempfile.mkstemp(prefix="upload-", suffix=Path(f.filename or "").suffix.lower(), dir=UPLOAD_DIR)
+    written = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            for chunk in iter(lambda: f.stream.read(UPLOAD_CHUNK), b""):
+                written += len(chunk)
+                if limit and written > limit:
+                    raise UploadTooLarge(f"Datei ist größer als {UPLOAD_MAX_MB} MB.")
+                out.write(chunk)
+    except BaseException:
+        discard_upload(Path(name))
+        raise
+    return Path(name)
+
+def discard_upload(path: Optional[Path]) -> None:
+    if path is None:
+        return
+    try:
+        Path(path).unlink()
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        # z. B. Windows, solange noch ein Handle offen ist – prune_uploads räumt später auf
+        print("Spool-Datei nicht löschbar:", e)
+
+def prune_uploads(max_age: float) -> None:
+    """Spool-Dateien abgestürzter Prozesse entfernen."""
+    cutoff = time.time() - max_age
+    try:
+        entries = list(os.scandir(UPLOAD_DIR))
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.unlink(entry.path)
+        except OSError:
+            pass
+
+_TESS_LANGUAGES: Optional[set] = None
+_TESS_LANGUAGES_LOCK = threading.Lock()
+
+def tesseract_languages() -> set:
+    """Verfügbare Tesseract-Sprachen – einmal ermittelt, danach aus dem Cache."""
+    global _TESS_LANGUAGES
+    with _TESS_LANGUAGES_LOCK:
+        if _TESS_LANGUAGES is None:
+            try:
+                if _use_tesserocr():
+                    _TESS_LANGUAGES = set(_TESSEROCR.get_languages()[1])
+                else:
+                    _TESS_LANGUAGES = set(pytesseract.get_languages(config=""))
+            except Exception:
+                return {"deu"}
+        return _TESS_LANGUAGES
+
 def tesseract_lang(choice: str) -> str:
     """
     choice: 'deu' (Antiqua) oder 'frak' (Fraktur)
     Wählt einen tatsächlich verfügbaren Sprachcode.
     """
-    try:
-        available = set(pytesseract.get_languages(config=""))
-    except Exception:
-        available = {"deu"}
+    available = tesseract_languages()
 
     if choice == "frak":
         for cand in ("deu_frak", "Fraktur", "frk", "deu"):
@@ -113,48 +625,535 @@ def tesseract_lang(choice: str) -> str:
         return "deu"
     return "deu" if "deu" in available else (sorted(available)[0])
 
-def pdf_to_images(pdf_bytes: bytes) -> List[Image.Image]:
+def _pdf2image_kwargs() -> Dict[str, object]:
+    kwargs: Dict[str, object] = {}
+    poppler_path = os.environ.get("POPPLER_PATH")  # z. B. C:\Tools\poppler\Library\bin
+    if poppler_path:
+        kwargs["poppler_path"] = poppler_path
+    return kwargs
+
+_PDF_READER_MISSING = ("Kein funktionierender PDF-Reader gefunden. "
+                       "Installiere Poppler (und setze PATH oder POPPLER_PATH) oder 'pip install pymupdf'.")
+# wird gesetzt, sobald pdf2image meldet, dass Poppler fehlt – dann nur noch PyMuPDF
+_POPPLER_MISSING = False
+
+T = TypeVar("T")
+
+def _pdf_read(via_pdf2image: Callable[[], T], via_pymupdf: Callable[[], T]) -> T:
     """
-    Versucht zuerst pdf2image (+ Poppler). Wenn Poppler fehlt oder scheitert,
-    fällt auf PyMuPDF zurück – falls installiert.
-    Optional: POPPLER_PATH Umgebungsvariable verwenden.
+    Einheitlicher Backend-Fallback für alle PDF-Zugriffe: erst pdf2image
+    (Poppler), bei Fehler PyMuPDF; scheitert beides → RuntimeError. Fehlt
+    Poppler, wird pdf2image im Prozess nicht erneut versucht.
     """
-    # 1) pdf2image versuchen
-    if _IMAGES_FROM_PDF_BACKEND == "pdf2image":
+    global _POPPLER_MISSING
+    if _pdf_backend() == "pdf2image" and not _POPPLER_MISSING:
         try:
-            from pdf2image import convert_from_bytes
-            import os as _os
-            poppler_path = _os.environ.get("POPPLER_PATH")  # z. B. C:\Tools\poppler\Library\bin
-            kwargs = {"dpi": 300}
-            if poppler_path:
-                kwargs["poppler_path"] = poppler_path
-            return convert_from_bytes(pdf_bytes, **kwargs)
+            return via_pdf2image()
         except Exception as e:
+            from pdf2image.exceptions import PDFInfoNotInstalledError
+            if isinstance(e, PDFInfoNotInstalledError):
+                _POPPLER_MISSING = True
             print("pdf2image fehlgeschlagen:", e)
+    try:
+        return via_pymupdf()
+    except Exception as e:
+        raise RuntimeError(_PDF_READER_MISSING) from e
+
+def _pixmap_to_image(pix, dpi: int) -> Image.Image:
+    img = Image.frombytes("RGBA" if pix.alpha else "RGB", (pix.width, pix.height), pix.samples)
+    img.info["dpi"] = (dpi, dpi)
+    return img
+
+def _iter_pages_pdf2image(pdf_path: Path, dpi: int, window: int, skip: Set[int]) -> Iterator[Tuple[int, Image.Image]]:
+    # Seitenzahl sofort (nicht erst beim ersten next()), damit _pdf_read auf PyMuPDF ausweichen kann
+    from pdf2image import convert_from_path, pdfinfo_from_path
+    kwargs = _pdf2image_kwargs()
+    total = int(pdfinfo_from_path(str(pdf_path), **kwargs)["Pages"])
+    wanted = [p for p in range(1, total + 1) if p - 1 not in skip]
+
+    def pages() -> Iterator[Tuple[int, Image.Image]]:
+        i = 0
+        while i < len(wanted):
+            # zusammenhängende Seiten (höchstens window) in einem Aufruf rendern
+            j = i
+            while j + 1 < len(wanted) and wanted[j + 1] == wanted[j] + 1 and j + 1 - i < window:
+                j += 1
+            first, last = wanted[i], wanted[j]
+            batch = convert_from_path(str(pdf_path), dpi=dpi, first_page=first, last_page=last, **kwargs)
+            for offset, img in enumerate(batch):
+                img.info["dpi"] = (dpi, dpi)
+                yield first - 1 + offset, img
+            del batch
+            i = j + 1
+    return pages()
+
+def _iter_pages_pymupdf(pdf_path: Path, dpi: int, skip: Set[int]) -> Iterator[Tuple[int, Image.Image]]:
+    import fitz  # PyMuPDF
+    doc = fitz.open(str(pdf_path), filetype="pdf")  # sofort öffnen, s. o.
+
+    def pages() -> Iterator[Tuple[int, Image.Image]]:
+        try:
+            for i in range(doc.page_count):
+                if i in skip:
+                    continue
+                yield i, _pixmap_to_image(doc.load_page(i).get_pixmap(dpi=dpi), dpi)
+        finally:
+            doc.close()
+    return pages()
+
+def pdf_page_count(pdf_path: Path) -> int:
+    def via_pdf2image() -> int:
+        from pdf2image import pdfinfo_from_path
+        return int(pdfinfo_from_path(str(pdf_path), **_pdf2image_kwargs())["Pages"])
+
+    def via_pymupdf() -> int:
+        import fitz  # PyMuPDF
+        with fitz.open(str(pdf_path), filetype="pdf") as doc:
+            return doc.page_count
+
+    return _pdf_read(via_pdf2image, via_pymupdf)
+
+def iter_pdf_pages(
+    pdf_path: Path,
+    dpi: int = PDF_RENDER_DPI,
+    window: Optional[int] = None,
+    skip: Optional[Set[int]] = None
+) -> Iterator[Tuple[int, Image.Image]]:
+    """
+    Rastert das PDF (Datei, nicht im Speicher) seitenweise und liefert
+    (seitenindex, bild) – 0-basiert.
+    Es liegen höchstens `window` Seiten gleichzeitig im Speicher (pdf2image
+    rendert in Fenstern via first_page/last_page, PyMuPDF Seite für Seite).
+    Seiten in `skip` werden gar nicht gerastert. Das Backend wählt _pdf_read
+    beim Öffnen; Fehler mitten im Dokument werden durchgereicht.
+    """
+    window = max(1, window or PDF_PAGE_WINDOW)
+    skip = skip or set()
+    return _pdf_read(lambda: _iter_pages_pdf2image(pdf_path, dpi, window, skip),
+                     lambda: _iter_pages_pymupdf(pdf_path, dpi, skip))
+
+class PdfPage(NamedTuple):
+    """Verweis auf eine PDF-Seite – klein genug, um ihn statt des Bilds an den OCR-Pool zu schicken."""
+    path: str
+    index: int
+    dpi: int
+
+# was ocr_pages als Seite annimmt: fertiges Bild, Bilddatei oder PDF-Seite
+PageSource = Union[Image.Image, Path, PdfPage]
+
+def render_pdf_page(pdf_path: Path, index: int, dpi: int = PDF_RENDER_DPI) -> Image.Image:
+    """Rastert genau eine Seite (0-basiert); Backend-Wahl wie bei iter_pdf_pages."""
+    def via_pdf2image() -> Image.Image:
+        from pdf2image import convert_from_path
+        img = convert_from_path(str(pdf_path), dpi=dpi, first_page=index + 1, last_page=index + 1,
+                                **_pdf2image_kwargs())[0]
+        img.info["dpi"] = (dpi, dpi)
+        return img
+
+    def via_pymupdf() -> Image.Image:
+        import fitz  # PyMuPDF
+        with fitz.open(str(pdf_path), filetype="pdf") as doc:
+            return _pixmap_to_image(doc.load_page(index).get_pixmap(dpi=dpi), dpi)
+
+    return _pdf_read(via_pdf2image, via_pymupdf)
 
-    # 2) PyMuPDF als Fallback
+def load_page(page: PageSource) -> Image.Image:
+    if isinstance(page, PdfPage):
+        return render_pdf_page(Path(page.path), page.index, page.dpi)
+    if isinstance(page, Path):
+        with Image.open(page) as img:
+            img.load()  # Datei sofort wieder freigeben (Spool-Datei darf danach gelöscht werden)
+            return img
+    return page
+
+def text_layer_usable(text: str) -> bool:
+    """
+    Heuristik: ist die eingebettete Textebene gut genug, um die OCR zu
+    sparen? Verlangt genug Text, überwiegend Buchstaben, wortartige Tokens
+    und kaum Zeichen ohne Unicode-Zuordnung (kaputte Font-Encodings).
+    """
+    chars = [c for c in text if not c.isspace()]
+    if len(chars) < TEXT_LAYER_MIN_CHARS:
+        return False
+    if sum(c.isalpha() for c in chars) < 0.6 * len(chars):
+        return False
+    unmapped = sum(1 for c in chars if c == "\ufffd" or "\ue000" <= c <= "\uf8ff")
+    if unmapped > 0.02 * len(chars) or "(cid:" in text:
+        return False
+    tokens = re.findall(r"\w+", text)
+    wordlike = sum(1 for t in tokens if len(t) > 1 and t.isalpha())
+    return wordlike >= 0.5 * len(tokens)
+
+def pdf_text_layer(pdf_path: Path) -> Dict[int, str]:
+    """
+    Brauchbare Textebenen je Seite (seitenindex → text, 0-basiert) über
+    PyMuPDF. Seiten ohne oder mit unbrauchbarer Textebene fehlen im Ergebnis;
+    ohne PyMuPDF ist das Ergebnis leer.
+    """
     try:
         import fitz  # PyMuPDF
-        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-        pages = []
-        for page in doc:
-            pix = page.get_pixmap(dpi=300)
-            import io as _io
-            img = Image.open(_io.BytesIO(pix.tobytes("png")))
-            pages.append(img)
-        return pages
+    except Exception:
+        return {}
+    texts: Dict[int, str] = {}
+    try:
+        with fitz.open(str(pdf_path), filetype="pdf") as doc:
+            for i in range(doc.page_count):
+                text = doc.load_page(i).get_text("text", sort=True).strip()
+                if text_layer_usable(text):
+                    texts[i] = text
     except Exception as e:
-        raise RuntimeError(
-            "Kein funktionierender PDF-Reader gefunden. "
-            "Installiere Poppler (und setze PATH oder POPPLER_PATH) oder 'pip install pymupdf'."
-        ) from e
+        print("Textebene nicht lesbar:", e)
+        return {}
+    return texts
+
+# stabile Tesseract-Config für Fließtext (LSTM, ein Textblock)
+OCR_CONFIG = "--oem 1 --psm 6"
+
+# je Thread (und damit je Pool-Prozess) eine initialisierte Engine pro Sprache
+_TESS_LOCAL = threading.local()
+
+def _use_tesserocr() -> bool:
+    if OCR_BACKEND == "pytesseract":
+        return False
+    if OCR_BACKEND == "tesserocr" and _TESSEROCR is None:
+        raise RuntimeError("OCR_BACKEND=tesserocr, aber 'tesserocr' ist nicht installiert.")
+    return _TESSEROCR is not None
+
+def _tesserocr_api(lang: str):
+    apis = getattr(_TESS_LOCAL, "apis", None)
+    if apis is None:
+        apis = _TESS_LOCAL.apis = {}
+    if lang not in apis:
+        try:
+            kwargs = {"lang": lang, "psm": _TESSEROCR.PSM.SINGLE_BLOCK, "oem": _TESSEROCR.OEM.LSTM_ONLY}
+            if os.environ.get("TESSDATA_PREFIX"):
+                kwargs["path"] = os.environ["TESSDATA_PREFIX"]
+            apis[lang] = _TESSEROCR.PyTessBaseAPI(**kwargs)
+        except Exception as e:
+            print(f"tesserocr für '{lang}' nicht nutzbar, verwende pytesseract:", e)
+            apis[lang] = None
+    return apis[lang]
+
+# --- Bildvorverarbeitung ------------------------------------------------------
+
+# gray:  nur Graustufen (bisheriges Verhalten)
+# scale: + Herunterrechnen auf OCR_TARGET_DPI (600-dpi-Scans, Fotos)
+# full:  + Rand beschneiden, adaptive Binarisierung, Schräglage korrigieren
+PREPROCESS_MODES = ("gray", "scale", "full")
+
+def _resample_to_dpi(gray: Image.Image, target_dpi: int) -> Image.Image:
+    # nur verkleinern; ohne DPI-Angabe (Fotos) die lange Kante auf A4 @ target_dpi begrenzen
+    dpi = gray.info.get("dpi")
+    src_dpi = float(dpi[0]) if dpi and dpi[0] else 0.0
+    if src_dpi > target_dpi:
+        factor = target_dpi / src_dpi
+    else:
+        max_side = int(11.7 * target_dpi)
+        factor = max_side / max(gray.size) if not src_dpi and max(gray.size) > max_side else 1.0
+    if factor >= 0.98:
+        return gray
+    size = (max(1, round(gray.width * factor)), max(1, round(gray.height * factor)))
+    out = gray.resize(size, Image.LANCZOS, reducing_gap=3.0)
+    out.info["dpi"] = (target_dpi, target_dpi)
+    return out
+
+def _adaptive_ink_mask(gray: Image.Image, np, offset_pct: int = 12):
+    """
+    Adaptive Schwelle (Bradley/Roth): Pixel ist Tinte, wenn er deutlich
+    dunkler ist als der Mittelwert seiner Umgebung. Den lokalen Mittelwert
+    liefert ein Box-Filter, der Vergleich läuft vektorisiert in NumPy.
+    """
+    radius = max(7, min(gray.size) // 60)
+    mean = np.asarray(gray.filter(ImageFilter.BoxBlur(radius)), dtype=np.int16)
+    pixels = np.asarray(gray, dtype=np.int16)
+    return pixels * 100 < mean * (100 - offset_pct)
+
+def _content_bbox(ink, np, pad: int = 10) -> Tuple[int, int, int, int]:
+    # Leerränder und schwarze Scannerränder (fast nur "Tinte") abschneiden
+    def span(profile):
+        content = np.flatnonzero((profile > 0.002) & (profile < 0.5))
+        if content.size == 0:
+            return 0, profile.size
+        return max(0, int(content[0]) - pad), min(profile.size, int(content[-1]) + 1 + pad)
+    top, bottom = span(ink.mean(axis=1))
+    left, right = span(ink.mean(axis=0))
+    return top, bottom, left, right
+
+def _estimate_skew(ink, np, max_angle: float = 5.0, step: float = 0.25, samples: int = 200_000) -> float:
+    """
+    Schräglage in Grad per Projektionsprofil: für jeden Kandidatenwinkel die
+    Tintenpixel auf Zeilen projizieren (bincount); die schärfsten Zeilen
+    (größte Varianz) gewinnen.
+    """
+    ys, xs = np.nonzero(ink)
+    if ys.size < 100:
+        return 0.0
+    if ys.size > samples:
+        pick = np.random.default_rng(0).choice(ys.size, samples, replace=False)
+        ys, xs = ys[pick], xs[pick]
+    ys = ys.astype(np.float64)
+    xs = xs.astype(np.float64)
+    best_angle, best_score = 0.0, -1.0
+    for angle in np.arange(-max_angle, max_angle + step / 2, step):
+        rows = ys - xs * np.tan(np.radians(angle))
+        rows -= rows.min()
+        score = float(np.bincount(rows.astype(np.int64)).var())
+        if score > best_score:
+            best_angle, best_score = float(angle), score
+    return best_angle
+
+def preprocess_image(img: Image.Image, mode: str = "gray", target_dpi: Optional[int] = None) -> Image.Image:
+    """Bereitet eine Seite für Tesseract auf – kleiner und sauberer je nach mode."""
+    gray = img.convert("L")
+    if "dpi" in img.info:
+        gray.info["dpi"] = img.info["dpi"]
+    if mode == "gray":
+        return gray
+    gray = _resample_to_dpi(gray, target_dpi or OCR_TARGET_DPI)
+    if mode == "scale":
+        return gray
+    if mode != "full":
+        raise ValueError(f"Unbekannte Vorverarbeitung: {mode}")
+
+    try:
+        import numpy as np
+    except ImportError as e:
+        raise RuntimeError("Vorverarbeitung 'full' benötigt NumPy ('pip install numpy').") from e
+    ink = _adaptive_ink_mask(gray, np)
+    top, bottom, left, right = _content_bbox(ink, np)
+    ink = ink[top:bottom, left:right]
+    angle = _estimate_skew(ink, np)
+    out = Image.fromarray(np.where(ink, 0, 255).astype(np.uint8), "L")
+    if abs(angle) >= 0.1:
+        out = out.rotate(angle, resample=Image.NEAREST, expand=True, fillcolor=255)
+    return out
 
 def ocr_image(img: Image.Image, lang: str) -> str:
-    # leichte Vorverarbeitung + stabile Tesseract-Config für Fließtext
+    # leichte Vorverarbeitung
     gray = img.convert("L")
-    config = "--oem 1 --psm 6"
-    text = pytesseract.image_to_string(gray, lang=lang, config=config)
-    return text
+    api = _tesserocr_api(lang) if _use_tesserocr() else None
+    if api is not None:
+        # Rohpixel direkt an libtesseract – kein Subprozess, keine Temp-PNG
+        api.SetImageBytes(gray.tobytes(), gray.width, gray.height, 1, gray.width)
+        return api.GetUTF8Text()
+    return pytesseract.image_to_string(gray, lang=lang, config=OCR_CONFIG)
+
+# --- OCR-Prozess-Pool ---------------------------------------------------------
+
+_OCR_POOL: Optional[ProcessPoolExecutor] = None
+_OCR_POOL_LOCK = threading.Lock()
+
+def _ocr_worker_init(tesseract_cmd: str, threads: str) -> None:
+    # Tesseract-internes OpenMP begrenzen, sonst N Prozesse × M Threads
+    os.environ["OMP_THREAD_LIMIT"] = threads
+    pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+
+def _ocr_task(idx: int, page: PageSource, lang: str, preprocess: str, target_dpi: Optional[int]) -> Tuple[int, str, float]:
+    # Rastern, Vorverarbeitung und OCR – im Pool komplett im Worker-Prozess
+    t0 = time.perf_counter()
+    text = ocr_image(preprocess_image(load_page(page), preprocess, target_dpi), lang=lang)
+    return idx, text, time.perf_counter() - t0
+
+def _ocr_mp_context():
+    # Kein fork: der Pool entsteht lazy in einem Prozess mit Job-Threads; ein Kind,
+    # das geforkt wird, während ein Thread z. B. _LAZY_LOCK hält (spacy.load),
+    # bliebe beim ersten _pdf_backend() für immer hängen.
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+def _get_ocr_pool() -> ProcessPoolExecutor:
+    global _OCR_POOL
+    with _OCR_POOL_LOCK:
+        if _OCR_POOL is None:
+            _OCR_POOL = ProcessPoolExecutor(
+                max_workers=OCR_WORKERS,
+                mp_context=_ocr_mp_context(),
+                initializer=_ocr_worker_init,
+                initargs=(pytesseract.pytesseract.tesseract_cmd, OCR_THREADS_PER_WORKER),
+            )
+        return _OCR_POOL
+
+def _reset_ocr_pool() -> None:
+    global _OCR_POOL
+    with _OCR_POOL_LOCK:
+        if _OCR_POOL is not None:
+            _OCR_POOL.shutdown(wait=False, cancel_futures=True)
+        _OCR_POOL = None
+
+# --- OCR-Cache ----------------------------------------------------------------
+
+def ocr_cache_variant(preprocess: str, target_dpi: int) -> str:
+    """Vorverarbeitung als Teil des Cache-Schlüssels (target_dpi nur, wo es wirkt)."""
+    return preprocess if preprocess == "gray" else f"{preprocess}@{target_dpi}"
+
+def ocr_cache_key(source_sha256: str, page: int, dpi: int, lang: str, variant: str = "") -> str:
+    """
+    Adresse einer Seite über die Eingabedatei (sha256), Seitenindex und
+    Rasterauflösung inkl. Sprache und Tesseract-Config; variant unterscheidet
+    die Vorverarbeitung. Ein Treffer braucht also weder Rastern noch Pixel-Hash.
+    """
+    raw = f"{source_sha256}|{page}|{dpi}|{lang}|{OCR_CONFIG}|{variant}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+def _ocr_cache_path(key: str) -> Path:
+    return OCR_CACHE_DIR / key[:2] / f"{key}.txt"
+
+# laufende Cache-Größe in Bytes; None = noch nicht gezählt (erst beim ersten Schreiben)
+_OCR_CACHE_BYTES: Optional[int] = None
+_OCR_CACHE_LOCK = threading.Lock()
+
+def _ocr_cache_scan() -> List[Tuple[float, int, Path]]:
+    entries = []
+    for path in OCR_CACHE_DIR.glob("*/*.txt"):
+        try:
+            st = path.stat()
+        except OSError:
+            continue
+        entries.append((st.st_mtime, st.st_size, path))
+    return entries
+
+def ocr_cache_get(key: str) -> Optional[str]:
+    if OCR_CACHE_MAX_MB <= 0:
+        return None
+    path = _ocr_cache_path(key)
+    try:
+        text = path.read_text(encoding="utf-8")
+        os.utime(path)  # mtime = letzter Zugriff (LRU)
+        return text
+    except OSError:
+        return None
+
+def ocr_cache_put(key: str, text: str) -> None:
+    global _OCR_CACHE_BYTES
+    if OCR_CACHE_MAX_MB <= 0:
+        return
+    path = _ocr_cache_path(key)
+    data = text.encode("utf-8")
+    try:
+        ensure_dir(path.parent)
+        try:
+            replaced = path.stat().st_size
+        except FileNotFoundError:
+            replaced = 0
+        tmp = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+    except OSError as e:
+        print("OCR-Cache nicht beschreibbar:", e)
+        return
+    with _OCR_CACHE_LOCK:
+        if _OCR_CACHE_BYTES is None:
+            _OCR_CACHE_BYTES = sum(size for _, size, _ in _ocr_cache_scan())
+        else:
+            _OCR_CACHE_BYTES += len(data) - replaced
+
+def ocr_cache_evict(max_bytes: Optional[int] = None) -> None:
+    """
+    Löscht die am längsten nicht benutzten Einträge, bis der Cache unter
+    max_bytes liegt. Verzeichnis-Scan nur, wenn die laufende Größe das
+    Limit überschreitet (oder noch unbekannt ist); danach ist sie wieder exakt.
+    """
+    global _OCR_CACHE_BYTES
+    if OCR_CACHE_MAX_MB <= 0:
+        return  # Cache aus: vorhandene Einträge unangetastet lassen
+    max_bytes = OCR_CACHE_MAX_MB * 1024 * 1024 if max_bytes is None else max_bytes
+    with _OCR_CACHE_LOCK:
+        if _OCR_CACHE_BYTES is not None and _OCR_CACHE_BYTES <= max_bytes:
+            return
+        if not OCR_CACHE_DIR.exists():
+            _OCR_CACHE_BYTES = 0
+            return
+        entries = sorted(_ocr_cache_scan())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= max_bytes:
+                break
+            try:
+                path.unlink()
+                total -= size
+            except OSError:
+                pass
+        _OCR_CACHE_BYTES = total
+
+def ocr_cache_lookup(source_sha256: str, pages: Iterable[int], dpi: int, lang: str, variant: str) -> Dict[int, str]:
+    """Cache-Treffer (seitenindex → text) für die Seiten einer Eingabedatei."""
+    hits: Dict[int, str] = {}
+    if OCR_CACHE_MAX_MB <= 0:
+        return hits
+    for idx in pages:
+        text = ocr_cache_get(ocr_cache_key(source_sha256, idx, dpi, lang, variant))
+        if text is not None:
+            hits[idx] = text
+    return hits
+
+def ocr_pages(
+    pages: Iterable[Tuple[int, PageSource]],
+    lang: str,
+    on_page: Optional[Callable[[int, str], None]] = None,
+    workers: Optional[int] = None,
+    preprocess: Optional[str] = None,
+    target_dpi: Optional[int] = None,
+    stats: Optional[Dict[str, int]] = None,
+    source_sha256: Optional[str] = None,
+    dpi: int = 0
+) -> List[str]:
+    """
+    OCR für (seitenindex, seite)-Paare; seite ist ein Bild oder – damit der
+    Worker selbst rastert bzw. lädt – eine PdfPage oder ein Bildpfad. Mit
+    workers > 1 laufen die Seiten im Prozess-Pool; es sind höchstens
+    2×workers Seiten gleichzeitig unterwegs, damit der Seiten-Generator nicht
+    vorausläuft. on_page(idx, text) wird in Fertigstellungs-Reihenfolge
+    aufgerufen, das Ergebnis ist nach Seite sortiert. Die Vorverarbeitung
+    (preprocess_image) läuft mit im Worker. Mit
+    source_sha256 (und der Rasterauflösung dpi) landen die Texte im OCR-Cache;
+    nachsehen muss der Aufrufer vorher (ocr_cache_lookup), damit Treffer gar
+    nicht erst gerastert werden. stats erhält ocr.
+    """
+    workers = OCR_WORKERS if workers is None else workers
+    preprocess = preprocess or OCR_PREPROCESS
+    target_dpi = target_dpi or OCR_TARGET_DPI
+    variant = ocr_cache_variant(preprocess, target_dpi)
+    texts: Dict[int, str] = {}
+    stats = {} if stats is None else stats
+    stats.update(ocr=0)
+
+    def page_done(idx: int, txt: str, seconds: float):
+        texts[idx] = txt
+        stats["ocr"] += 1
+        METRICS.inc("pages_total", source="ocr")
+        METRICS.observe("ocr_page_seconds", seconds)
+        if source_sha256:
+            ocr_cache_put(ocr_cache_key(source_sha256, idx, dpi, lang, variant), txt)
+        if on_page:
+            on_page(idx, txt)
+
+    if workers <= 1:
+        for idx, page in pages:
+            page_done(*_ocr_task(idx, page, lang, preprocess, target_dpi))
+        return [texts[i] for i in sorted(texts)]
+
+    def collect(done):
+        for fut in done:
+            page_done(*fut.result())
+
+    pool = _get_ocr_pool()
+    pending = set()
+    try:
+        for idx, page in pages:
+            pending.add(pool.submit(_ocr_task, idx, page, lang, preprocess, target_dpi))
+            if len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            collect(done)
+    except BrokenProcessPool as e:
+        _reset_ocr_pool()
+        raise RuntimeError("OCR-Prozess unerwartet beendet.") from e
+    finally:
+        for fut in pending:
+            fut.cancel()
+    return [texts[i] for i in sorted(texts)]
 
 def split_annals_by_year(full_text: str) -> Dict[str, str]:
     """
@@ -191,68 +1190,202 @@ def write_file(path: Path, content: str) -> None:
     ensure_dir(path.parent)
     path.write_text(content, encoding="utf-8")
 
-def make_zip_of_folder(folder: Path) -> bytes:
-    memory_file = io.BytesIO()
-    with zipfile.ZipFile(memory_file, 'w', zipfile.ZIP_DEFLATED) as zf:
-        for root, _, files in os.walk(folder):
-            for f in files:
-                full = Path(root) / f
-                zf.write(full, arcname=str(full.relative_to(folder)))
-    memory_file.seek(0)
-    return memory_file.read()
+def make_zip_of_folder(folder: Path, target: Path, level: Optional[int] = None, exclude: Iterable[str] = ()) -> Path:
+    """
+    Schreibt das ZIP Eintrag für Eintrag direkt nach target (konstanter
+    Speicherbedarf, unabhängig von der Archivgröße). level 0 = STORED,
+    1–9 = DEFLATE-Stufe; Standard ZIP_COMPRESSLEVEL. Einträge direkt unter
+    folder, deren Name in exclude steht, fehlen im Archiv.
+    """
+    exclude = set(exclude)
+    level = ZIP_COMPRESSLEVEL if level is None else level
+    if level <= 0:
+        compression, compresslevel = zipfile.ZIP_STORED, None
+    else:
+        compression, compresslevel = zipfile.ZIP_DEFLATED, min(9, level)
+    # erst unter temporärem Namen schreiben, damit /download nie ein halbes Archiv sieht
+    part = target.with_name(f"{target.name}.{uuid.uuid4().hex}.part")
+    try:
+        with zipfile.ZipFile(part, "w", compression, compresslevel=compresslevel) as zf:
+            for root, dirs, files in os.walk(folder):
+                top = Path(root) == folder
+                dirs[:] = sorted(d for d in dirs if not (top and d in exclude))
+                for f in sorted(files):
+                    if top and f in exclude:
+                        continue
+                    full = Path(root) / f
+                    zf.write(full, arcname=str(full.relative_to(folder)))
+        os.replace(part, target)
+    finally:
+        if part.exists():
+            part.unlink()
+    return target
 
 # --- Auto-Indexer / Linker ---------------------------------------------------
 
-def detect_entities(text: str) -> Dict[str, Dict[str, List[str]]]:
+def _configure_spacy(nlp):
     """
-    Liefert ein Dict mit Schlüsseln 'personen', 'orte', 'worte', 'schlagworte'
-    jeweils -> {ent: [fundstellen...]} (Fundstellen = kurze Snippets).
+    Nur behalten, was PER/LOC/GPE, Wortarten und Satzgrenzen liefert:
+    Lemmatizer aus, Parser durch den schnelleren Satzsegmentierer ersetzen.
     """
+    for name in SPACY_UNUSED_COMPONENTS:
+        if name in nlp.pipe_names:
+            nlp.disable_pipe(name)
+    if "senter" in nlp.disabled and "parser" in nlp.pipe_names:
+        try:
+            nlp.enable_pipe("senter")
+            nlp.disable_pipe("parser")
+        except Exception as e:
+            print("spaCy: senter nicht nutzbar, behalte parser:", e)
+    return nlp
+
+class SentenceIndex:
+    """
+    Satzgrenzen (Punkt-Positionen) eines Texts, einmal berechnet.
+    snippet(idx) liefert den Satz um idx (vom vorigen bis zum nächsten Punkt,
+    ohne Punkt danach höchstens window Zeichen), findet die Grenzen per
+    bisect und gibt für denselben Satz immer dasselbe String-Objekt zurück.
+    """
+
+    def __init__(self, text: str, window: int = 180):
+        self.text = text
+        self.window = window
+        self.dots = [m.start() for m in re.finditer(r"\.", text)]
+        self._snippets: Dict[Tuple[int, int], str] = {}
+
+    def bounds(self, idx: int) -> Tuple[int, int]:
+        i = bisect_left(self.dots, idx)  # erster Punkt an/nach idx
+        start = self.dots[i - 1] + 1 if i > 0 else 0
+        end = self.dots[i] if i < len(self.dots) else min(len(self.text), idx + self.window)
+        return start, end
+
+    def snippet(self, idx: int) -> str:
+        key = self.bounds(idx)
+        snip = self._snippets.get(key)
+        if snip is None:
+            snip = self._snippets[key] = self.text[key[0]:key[1]].strip()
+        return snip
+
+def _add_mention(found: Dict[str, List[str]], key: str, snippet: str) -> None:
+    # gleiche Fundstelle (z. B. zwei Treffer im selben Satz) nur einmal ablegen
+    mentions = found.setdefault(key, [])
+    if not mentions or mentions[-1] != snippet:
+        mentions.append(snippet)
+
+def _entities_from_doc(doc) -> Dict[str, Dict[str, List[str]]]:
     persons: Dict[str, List[str]] = {}
     places: Dict[str, List[str]] = {}
     words: Dict[str, List[str]] = {}
-    specials: Dict[str, List[str]] = {}
-
-    if _SPACY_NLP:
-        doc = _SPACY_NLP(text)
-        for ent in doc.ents:
-            if ent.label_ in ("PER",):
-                persons.setdefault(ent.text, []).append(ent.sent.text.strip())
-            elif ent.label_ in ("LOC","GPE"):
-                places.setdefault(ent.text, []).append(ent.sent.text.strip())
-        for token in doc:
-            if token.pos_ in ("NOUN", "PROPN"):
-                t = token.text.strip()
-                if t and t.lower() not in GERMAN_STOPWORDS and not t[0].isdigit():
-                    words.setdefault(t, []).append(token.sent.text.strip())
-    else:
-        for m in re.finditer(r"\b(" + "|".join(TITLES) + r")\s+[A-ZÄÖÜ][a-zäöüß]+(?:\s+von\s+[A-ZÄÖÜ][a-zäöüß]+)?", text):
-            persons.setdefault(m.group(0), []).append(get_sentence(text, m.start()))
-        for m in re.finditer(r"\b(?:zu|in|bei|nach|aus|von)\s+([A-ZÄÖÜ][A-Za-zÄÖÜäöüß\-]+)", text):
-            places.setdefault(m.group(1), []).append(get_sentence(text, m.start()))
-        for hint in PLACE_HINTS:
-            for m in re.finditer(rf"\b{hint}\s+([A-ZÄÖÜ][A-Za-zÄÖÜäöüß\-]+)", text):
-                places.setdefault(m.group(1), []).append(get_sentence(text, m.start()))
-        for m in re.finditer(r"\b([A-ZÄÖÜ][a-zäöüß]{3,})\b", text):
-            token = m.group(1)
-            if token.lower() not in GERMAN_STOPWORDS and token not in persons and token not in places:
-                words.setdefault(token, []).append(get_sentence(text, m.start()))
-
+    sentences: Dict[int, str] = {}
+
+    def sentence(span) -> str:
+        sent = span.sent
+        snip = sentences.get(sent.start_char)
+        if snip is None:
+            snip = sentences[sent.start_char] = sent.text.strip()
+        return snip
+
+    for ent in doc.ents:
+        if ent.label_ in ("PER",):
+            _add_mention(persons, ent.text, sentence(ent))
+        elif ent.label_ in ("LOC","GPE"):
+            _add_mention(places, ent.text, sentence(ent))
+    for token in doc:
+        if token.pos_ in ("NOUN", "PROPN"):
+            t = token.text.strip()
+            if t and t.lower() not in GERMAN_STOPWORDS and not t[0].isdigit():
+                _add_mention(words, t, sentence(token))
+    return {"personen": persons, "orte": places, "worte": words,
+            "schlagworte": _detect_special_keywords(doc.text)}
+
+def _detect_special_keywords(text: str, sentences: Optional[SentenceIndex] = None) -> Dict[str, List[str]]:
     # Spezielle Schlagworte (case-insensitive, Wortgrenzen)
+    sentences = sentences or SentenceIndex(text)
+    specials: Dict[str, List[str]] = {}
     for pattern in SPECIAL_KEYWORDS:
         rx = re.compile(rf"\b{pattern}\b", flags=re.IGNORECASE)
         for m in rx.finditer(text):
             kw = m.group(0)  # wie im Text gefunden
-            specials.setdefault(kw, []).append(get_sentence(text, m.start()))
+            _add_mention(specials, kw, sentences.snippet(m.start()))
+    return specials
 
-    return {"personen": persons, "orte": places, "worte": words, "schlagworte": specials}
+def detect_entities(text: str) -> Dict[str, Dict[str, List[str]]]:
+    """
+    Liefert ein Dict mit Schlüsseln 'personen', 'orte', 'worte', 'schlagworte'
+    jeweils -> {ent: [fundstellen...]} (Fundstellen = kurze Snippets).
+    """
+    nlp = _get_spacy_nlp()
+    if nlp:
+        return _entities_from_doc(nlp(text))
 
-def get_sentence(text: str, idx: int, window: int=180) -> str:
-    start = max(0, text.rfind('.', 0, idx) + 1)
-    end = text.find('.', idx)
-    if end == -1:
-        end = min(len(text), idx + window)
-    return text[start:end].strip()
+    sentences = SentenceIndex(text)
+    persons: Dict[str, List[str]] = {}
+    places: Dict[str, List[str]] = {}
+    words: Dict[str, List[str]] = {}
+    for m in re.finditer(r"\b(" + "|".join(TITLES) + r")\s+[A-ZÄÖÜ][a-zäöüß]+(?:\s+von\s+[A-ZÄÖÜ][a-zäöüß]+)?", text):
+        _add_mention(persons, m.group(0), sentences.snippet(m.start()))
+    for m in re.finditer(r"\b(?:zu|in|bei|nach|aus|von)\s+([A-ZÄÖÜ][A-Za-zÄÖÜäöüß\-]+)", text):
+        _add_mention(places, m.group(1), sentences.snippet(m.start()))
+    for hint in PLACE_HINTS:
+        for m in re.finditer(rf"\b{hint}\s+([A-ZÄÖÜ][A-Za-zÄÖÜäöüß\-]+)", text):
+            _add_mention(places, m.group(1), sentences.snippet(m.start()))
+    for m in re.finditer(r"\b([A-ZÄÖÜ][a-zäöüß]{3,})\b", text):
+        token = m.group(1)
+        if token.lower() not in GERMAN_STOPWORDS and token not in persons and token not in places:
+            _add_mention(words, token, sentences.snippet(m.start()))
+
+    return {"personen": persons, "orte": places, "worte": words,
+            "schlagworte": _detect_special_keywords(text, sentences)}
+
+def detect_entities_batch(
+    texts: Iterable[str],
+    batch_size: Optional[int] = None,
+    n_process: Optional[int] = None
+) -> Iterator[Dict[str, Dict[str, List[str]]]]:
+    """
+    Wie detect_entities, aber für viele Abschnitte (z. B. alle Jahre aus
+    split_annals_by_year): mit spaCy gebündelt über nlp.pipe, optional in
+    mehreren Prozessen. Liefert die Ergebnisse lazy in Eingabe-Reihenfolge.
+    """
+    nlp = _get_spacy_nlp()
+    if not nlp:
+        for text in texts:
+            yield detect_entities(text)
+        return
+    docs = nlp.pipe(
+        texts,
+        batch_size=batch_size or SPACY_BATCH_SIZE,
+        n_process=n_process or SPACY_N_PROCESS,
+    )
+    for doc in docs:
+        yield _entities_from_doc(doc)
+
+# Link-Reihenfolge: erst Spezial-Schlagwörter (case-insensitive),
+# dann Personen/Orte/Worte (case-sensitive, um Eigennamen zu schonen)
+LINK_KINDS = ("schlagworte", "personen", "orte", "worte")
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """
+    Baut aus den Wörtern eine Regex-Alternation in Präfixbaum-Form.
+    Optionale Fortsetzungen sind gierig, d. h. an jeder Position gewinnt
+    der längste Eintrag – wie bei einer nach Länge sortierten Alternation,
+    aber ohne jeden Eintrag einzeln durchzuprobieren.
+    """
+    trie: Dict[str, dict] = {}
+    for w in words:
+        node = trie
+        for ch in w:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node: Dict[str, dict]) -> str:
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
 
 def annotate_text_with_links(
     text: str,
@@ -262,75 +1395,450 @@ def annotate_text_with_links(
     """
     Ersetzt Vorkommen im Text durch Markdown-Links zu Registerdateien.
     Gibt (annotierter_text, verwendete_entities) zurück.
+    Alle Arten werden in einem einzigen Durchlauf verlinkt; bereits
+    eingefügte Links werden dadurch nicht erneut durchsucht. Innerhalb einer
+    Art gewinnt der längste Treffer, zwischen den Arten entscheidet an
+    derselben Position die Reihenfolge in LINK_KINDS – unabhängig von der
+    Länge (Schlagwort "Markt" schlägt Ort "Markt Bibart", wie bisher).
     """
     used = {"personen": {}, "orte": {}, "worte": {}, "schlagworte": {}}
 
     def sorted_keys(d):
         return sorted(d.keys(), key=lambda s: (-len(s), s.lower()))
 
-    # Reihenfolge: erst Spezial-Schlagwörter (case-insensitive),
-    # dann Personen/Orte/Worte (case-sensitive, um Eigennamen zu schonen)
-    for ent in sorted_keys(entities.get("schlagworte", {})):
-        slug = slugify(ent)
-        link = f"[{ent}]({base_rel_to_register}/schlagworte/{slug}.md)"
-        pattern = re.compile(rf"\b{re.escape(ent)}\b", flags=re.IGNORECASE)
-        if pattern.search(text):
-            text = pattern.sub(link, text)
-            used["schlagworte"].setdefault(ent, entities["schlagworte"][ent])
-
-    for kind in ("personen","orte","worte"):
+    # je Art: Treffertext (bei Schlagworten klein geschrieben) -> (Eintrag, Link)
+    targets: Dict[str, Dict[str, Tuple[str, str]]] = {}
+    groups = []
+    for kind in LINK_KINDS:
+        table: Dict[str, Tuple[str, str]] = {}
         for ent in sorted_keys(entities.get(kind, {})):
-            slug = slugify(ent)
-            link = f"[{ent}]({base_rel_to_register}/{kind}/{slug}.md)"
-            pattern = re.compile(rf"\b{re.escape(ent)}\b")
-            if pattern.search(text):
-                text = pattern.sub(link, text)
+            if not ent:
+                continue
+            link = f"[{ent}]({base_rel_to_register}/{kind}/{slugify(ent)}.md)"
+            table.setdefault(ent.lower() if kind == "schlagworte" else ent, (ent, link))
+        if not table:
+            continue
+        targets[kind] = table
+        alternation = _trie_pattern(table)
+        if kind == "schlagworte":
+            alternation = f"(?i:{alternation})"
+        groups.append(f"(?P<{kind}>{alternation})")
+
+    if not groups:
+        return text, used
+
+    found: Dict[str, set] = {kind: set() for kind in targets}
+    pattern = re.compile(r"\b(?:" + "|".join(groups) + r")\b")
+
+    def replace(m: re.Match) -> str:
+        kind = m.lastgroup
+        hit = m.group(kind)
+        table = targets[kind]
+        if kind == "schlagworte":
+            target = table.get(hit.lower())
+            if target is None:  # Sonderfälle der Groß-/Kleinschreibung
+                target = next(t for k, t in table.items() if re.fullmatch(re.escape(k), hit, re.IGNORECASE))
+        else:
+            target = table[hit]
+        found[kind].add(target[0])
+        return target[1]
+
+    text = pattern.sub(replace, text)
+
+    for kind in LINK_KINDS:
+        for ent in sorted_keys(entities.get(kind, {})):
+            if ent in found.get(kind, ()):
                 used[kind].setdefault(ent, entities[kind][ent])
 
     return text, used
 
-def update_register_files(
-    work_dir: Path,
-    used_entities: Dict[str, Dict[str, List[str]]],
-    mention_info: Tuple[str, str, str]
-) -> None:
-    """
-    Legt/aktualisiert die Registerdateien.
-    mention_info = (kind_context, relative_link_from_register, year_or_label)
-    """
-    register_root = work_dir / "register"
-    index_files = {
-        "personen":   register_root / "personen" / "README.md",
-        "orte":       register_root / "orte" / "README.md",
-        "worte":      register_root / "worte" / "README.md",
-        "schlagworte":register_root / "schlagworte" / "README.md",
-    }
-    for kind, idx_path in index_files.items():
-        ensure_dir(idx_path.parent)
-        if not idx_path.exists():
-            write_file(idx_path, f"# {kind.capitalize()}-Register\n\n")
-
-    kind_context, rel_link, label = mention_info
-
-    for kind in ("personen","orte","worte","schlagworte"):
-        for ent, snippets in used_entities.get(kind, {}).items():
-            slug = slugify(ent)
-            entry_file = register_root / kind / f"{slug}.md"
-            if not entry_file.exists():
-                write_file(entry_file, f"# {ent}\n\n**Ersterwähnung:** {label}\n\n## Vorkommen\n")
-            existing = entry_file.read_text(encoding="utf-8")
-            bullet = f"- {label}: [{kind_context}]({rel_link})"
-            if snippets:
-                bullet += f" – {snippets[0][:140].strip()}..."
-            if bullet not in existing:
-                write_file(entry_file, existing.rstrip() + "\n" + bullet + "\n")
-
-            idx_p = index_files[kind]
-            idx = idx_p.read_text(encoding="utf-8")
-            rel = f"./{slug}.md"
-            line = f"- [{ent}]({rel})"
-            if line not in idx:
-                write_file(idx_p, idx.rstrip() + "\n" + line + "\n")
+REGISTER_KINDS = ("personen", "orte", "worte", "schlagworte")
+
+class RegisterBuilder:
+    """
+    Sammelt die Registereinträge eines ganzen Werks im Speicher und schreibt
+    sie am Ende einmalig (write) – statt pro Erwähnung Eintrags- und
+    Indexdatei neu einzulesen und komplett zu überschreiben.
+    """
+
+    def __init__(self):
+        # kind -> slug -> {"title", "first", "bullets": [...], "mentions": [...], "seen": {...}}
+        self.entries: Dict[str, Dict[str, dict]] = {kind: {} for kind in REGISTER_KINDS}
+        # kind -> Indexzeilen in Einfüge-Reihenfolge (dict als geordnete Menge)
+        self.index: Dict[str, Dict[str, None]] = {kind: {} for kind in REGISTER_KINDS}
+        self.touched = False
+
+    def add(
+        self,
+        used_entities: Dict[str, Dict[str, List[str]]],
+        mention_info: Tuple[str, str, str]
+    ) -> None:
+        """
+        Nimmt die verwendeten Entitäten eines Abschnitts auf.
+        mention_info = (kind_context, relative_link_from_register, year_or_label)
+        """
+        self.touched = True
+        kind_context, rel_link, label = mention_info
+
+        for kind in REGISTER_KINDS:
+            for ent, snippets in used_entities.get(kind, {}).items():
+                slug = slugify(ent)
+                entry = self.entries[kind].get(slug)
+                if entry is None:
+                    entry = self.entries[kind][slug] = {"title": ent, "first": label, "bullets": [],
+                                                        "mentions": [], "seen": set()}
+                bullet = f"- {label}: [{kind_context}]({rel_link})"
+                if snippets:
+                    bullet += f" – {snippets[0][:140].strip()}..."
+                if bullet not in entry["seen"]:
+                    entry["seen"].add(bullet)
+                    entry["bullets"].append(bullet)
+                    entry["mentions"].append((label, kind_context, snippets[0].strip() if snippets else ""))
+
+                self.index[kind].setdefault(f"- [{ent}](./{slug}.md)")
+
+    def postings(self) -> Iterator[Tuple[str, str, str, str, str, str]]:
+        """(kind, name, slug, label, pfad, snippet) je Erwähnung – für den globalen Index."""
+        for kind in REGISTER_KINDS:
+            for slug, entry in self.entries[kind].items():
+                for label, path, snippet in entry["mentions"]:
+                    yield kind, entry["title"], slug, label, path, snippet
+
+    def write(self, work_dir: Path) -> None:
+        """Schreibt alle Registerdateien unter work_dir/register."""
+        if not self.touched:
+            return
+        register_root = work_dir / "register"
+        for kind in REGISTER_KINDS:
+            header = f"# {kind.capitalize()}-Register\n\n"
+            lines = self.index[kind]
+            content = header.rstrip() + "".join("\n" + line for line in lines) + "\n" if lines else header
+            write_file(register_root / kind / "README.md", content)
+
+            for slug, entry in self.entries[kind].items():
+                head = f"# {entry['title']}\n\n**Ersterwähnung:** {entry['first']}\n\n## Vorkommen"
+                write_file(register_root / kind / f"{slug}.md",
+                           head + "".join("\n" + b for b in entry["bullets"]) + "\n")
+
+# --- Globaler Register-Index ---------------------------------------------------
+
+# Werkübergreifender Suchindex (SQLite FTS5): Entität → (Werk, Jahr/Label,
+# Datei, Snippet). Jeder fertige Job ersetzt die Einträge seines Werks.
+# Die Datei liegt in der jeweiligen Ausgabe-Wurzel, damit die Pfade der Treffer
+# (<werk>/jahre/...) zum selben Baum gehören – /api/search liest output/.
+GLOBAL_INDEX_FILE = ".register-index.sqlite3"
+GLOBAL_INDEX_ENABLED = os.environ.get("GLOBAL_INDEX", "1").lower() not in ("0", "false", "no", "off")
+
+class GlobalRegisterIndex:
+    """
+    entities (kind, name, slug) mit FTS5-Spiegel entities_fts für Wort- und
+    Präfixsuche, postings je Erwähnung. Verbindungen pro Thread, Schreiben
+    in einer Transaktion (BEGIN IMMEDIATE) – wie SQLiteProgressStore.
+    """
+
+    SNIPPET_CHARS = 300
+
+    def __init__(self, path: str):
+        self.path = path
+        self.local = threading.local()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entities ("
+                "id INTEGER PRIMARY KEY, kind TEXT NOT NULL, name TEXT NOT NULL, slug TEXT NOT NULL, "
+                "UNIQUE (kind, slug))"
+            )
+            conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS entities_fts USING fts5("
+                "name, content='entities', content_rowid='id', "
+                "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS postings ("
+                "entity_id INTEGER NOT NULL REFERENCES entities(id), work TEXT NOT NULL, "
+                "label TEXT NOT NULL, path TEXT NOT NULL, snippet TEXT NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS postings_entity ON postings (entity_id, work)")
+            conn.execute("CREATE INDEX IF NOT EXISTS postings_work ON postings (work)")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self.local.conn = conn
+        return conn
+
+    def replace_work(self, work: str, postings: Iterable[Tuple[str, str, str, str, str, str]]) -> int:
+        """Ersetzt alle Einträge von work; verwaiste Entitäten fliegen raus. Liefert die Anzahl Postings."""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            old_ids = {row[0] for row in conn.execute(
+                "SELECT DISTINCT entity_id FROM postings WHERE work = ?", (work,))}
+            conn.execute("DELETE FROM postings WHERE work = ?", (work,))
+
+            ids: Dict[Tuple[str, str], int] = {}
+            rows = []
+            for kind, name, slug, label, path, snippet in postings:
+                entity_id = ids.get((kind, slug))
+                if entity_id is None:
+                    row = conn.execute("SELECT id FROM entities WHERE kind = ? AND slug = ?", (kind, slug)).fetchone()
+                    if row is None:
+                        entity_id = conn.execute("INSERT INTO entities (kind, name, slug) VALUES (?, ?, ?)",
+                                                 (kind, name, slug)).lastrowid
+                        conn.execute("INSERT INTO entities_fts (rowid, name) VALUES (?, ?)", (entity_id, name))
+                    else:
+                        entity_id = row[0]
+                    ids[(kind, slug)] = entity_id
+                rows.append((entity_id, work, label, path, snippet[:self.SNIPPET_CHARS]))
+            conn.executemany("INSERT INTO postings VALUES (?, ?, ?, ?, ?)", rows)
+
+            for entity_id in old_ids - set(ids.values()):
+                if conn.execute("SELECT 1 FROM postings WHERE entity_id = ? LIMIT 1", (entity_id,)).fetchone():
+                    continue
+                name = conn.execute("SELECT name FROM entities WHERE id = ?", (entity_id,)).fetchone()[0]
+                conn.execute("INSERT INTO entities_fts (entities_fts, rowid, name) VALUES ('delete', ?, ?)",
+                             (entity_id, name))
+                conn.execute("DELETE FROM entities WHERE id = ?", (entity_id,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return len(rows)
+
+    @staticmethod
+    def match_expression(query: str, prefix: bool) -> Optional[str]:
+        """Suchbegriff → FTS5-Ausdruck: alle Wörter (UND), mit prefix als Wortanfang."""
+        tokens = re.findall(r"\w+", query)
+        if not tokens:
+            return None
+        star = "*" if prefix else ""
+        return " ".join(f'"{t}"{star}' for t in tokens)
+
+    def search(self, query: str, kind: Optional[str] = None, prefix: bool = True,
+               limit: int = 20, mentions_per_work: int = 20) -> List[dict]:
+        """
+        Treffer nach FTS5-Rang; je Entität alle Werke mit ihrer Anzahl
+        Erwähnungen (mentions_total) und höchstens mentions_per_work Fundstellen.
+        """
+        expr = self.match_expression(query, prefix)
+        if expr is None:
+            return []
+        sql = ("SELECT e.id, e.kind, e.name, e.slug FROM entities_fts "
+               "JOIN entities e ON e.id = entities_fts.rowid WHERE entities_fts MATCH ?")
+        args: List[object] = [expr]
+        if kind:
+            sql += " AND e.kind = ?"
+            args.append(kind)
+        sql += " ORDER BY entities_fts.rank LIMIT ?"
+        args.append(limit)
+
+        conn = self._conn()
+        results = []
+        for entity_id, ent_kind, name, slug in conn.execute(sql, args).fetchall():
+            # Fundstellen je Werk nummerieren und zählen – das Limit gilt pro Werk, nicht pro Entität
+            works: Dict[str, dict] = {}
+            for work, count, label, path, snippet in conn.execute(
+                "SELECT work, n, label, path, snippet FROM ("
+                " SELECT work, label, path, snippet, rowid AS r,"
+                " ROW_NUMBER() OVER (PARTITION BY work ORDER BY rowid) AS rn,"
+                " COUNT(*) OVER (PARTITION BY work) AS n"
+                " FROM postings WHERE entity_id = ?) WHERE rn <= ? ORDER BY work, r",
+                (entity_id, mentions_per_work)
+            ):
+                w = works.setdefault(work, {"work": work, "register": f"{work}/register/{ent_kind}/{slug}.md",
+                                            "mentions_total": count, "mentions": []})
+                w["mentions"].append({"label": label, "path": f"{work}/{path}", "snippet": snippet})
+            results.append({"kind": ent_kind, "name": name,
+                            "mentions_total": sum(w["mentions_total"] for w in works.values()),
+                            "works": list(works.values())})
+        return results
+
+_GLOBAL_INDEXES: Dict[str, Optional[GlobalRegisterIndex]] = {}
+
+def _get_global_index(out_root: Optional[Path] = None) -> Optional[GlobalRegisterIndex]:
+    """
+    Index der Ausgabe-Wurzel (Standard output/) erst beim ersten Gebrauch
+    öffnen; None, wenn aus oder SQLite ohne FTS5.
+    """
+    if not GLOBAL_INDEX_ENABLED:
+        return None
+    path = os.path.abspath(Path(out_root or "output") / GLOBAL_INDEX_FILE)
+    if path not in _GLOBAL_INDEXES:
+        with _LAZY_LOCK:
+            if path not in _GLOBAL_INDEXES:
+                try:
+                    _GLOBAL_INDEXES[path] = GlobalRegisterIndex(path)
+                except sqlite3.Error as e:
+                    print("Globaler Register-Index nicht verfügbar:", e)
+                    _GLOBAL_INDEXES[path] = None
+    return _GLOBAL_INDEXES[path]
+
+# --- Job-Queue ----------------------------------------------------------------
+
+class JobCancelled(Exception):
+    pass
+
+class JobQueue:
+    """
+    Begrenzter Worker-Pool für OCR-Jobs. submit() kehrt sofort zurück und
+    wirft queue.Full, wenn die Warteschlange voll ist (→ HTTP 429).
+    Abbruch ist kooperativ: die Pipeline prüft check_cancelled() je Seite/Jahr.
+    """
+
+    ACTIVE = ("queued", "running")
+
+    def __init__(self, workers: int, depth: int):
+        self.workers = max(1, workers)
+        # Zulassung über queued (wartende, nicht abgebrochene Jobs) statt maxsize:
+        # abgebrochene IDs bleiben bis zum Herausnehmen in der Queue, belegen aber keinen Platz
+        self.queue: "queue.Queue[str]" = queue.Queue()
+        self.depth_limit = max(1, depth)
+        self.queued = 0
+        self.jobs: Dict[str, dict] = {}
+        self.lock = threading.Lock()
+        self.threads: List[threading.Thread] = []
+
+    def _start_workers(self) -> None:
+        # Threads erst beim ersten Job starten (nicht schon beim Import, z. B. in Pool-Prozessen)
+        if self.threads:
+            return
+        for n in range(self.workers):
+            t = threading.Thread(target=self._worker, name=f"ocr-job-{n}", daemon=True)
+            t.start()
+            self.threads.append(t)
+
+    def _prune(self) -> None:
+        cutoff = time.time() - JOB_RESULT_TTL
+        for job_id in [j for j, job in self.jobs.items()
+                       if job["status"] not in self.ACTIVE and (job["finished"] or 0) < cutoff]:
+            del self.jobs[job_id]
+
+    def submit(self, job_id: str, params: dict) -> dict:
+        with self.lock:
+            self._prune()
+            if job_id in self.jobs and self.jobs[job_id]["status"] in self.ACTIVE:
+                raise ValueError(f"Job {job_id} läuft bereits.")
+            for other in self.jobs.values():
+                if other["status"] in self.ACTIVE and other["params"]["work_name"] == params["work_name"]:
+                    raise ValueError(f"Werk '{params['work_name']}' wird bereits verarbeitet.")
+            self._start_workers()
+            job = {
+                "id": job_id, "status": "queued", "params": params,
+                "created": time.time(), "started": None, "finished": None,
+                "result": None, "error": None,
+                "cancel": threading.Event(), "finished_event": threading.Event(),
+            }
+            if self.queued >= self.depth_limit:
+                raise queue.Full  # Backpressure
+            self.queue.put_nowait(job_id)
+            self.queued += 1
+            self.jobs[job_id] = job
+            # noch unter dem Lock: der Worker sieht den Job erst danach
+            EVENTS.reset(job_id)
+            _progress_stage(job_id, "queued")
+            _progress_init(job_id, total=1, message="In Warteschlange…")
+        return self.status(job_id)
+
+    def status(self, job_id: str) -> Optional[dict]:
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            return {k: job[k] for k in ("id", "status", "created", "started", "finished", "error")} | {
+                "work_name": job["params"]["work_name"],
+                "queue_depth": self.queued,
+            }
+
+    def result(self, job_id: str) -> Optional[dict]:
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return job["result"] if job else None
+
+    def cancel(self, job_id: str) -> bool:
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None or job["status"] not in self.ACTIVE:
+                return False
+            job["cancel"].set()
+            queued = job["status"] == "queued"
+        _progress_finish(job_id, message="Abgebrochen.")
+        if queued:
+            with self.lock:
+                # Worker überspringt den Eintrag beim Herausnehmen
+                if job["status"] == "queued":
+                    self.queued -= 1
+                    self._finish(job, "cancelled", error="Abgebrochen.")
+        return True
+
+    def check_cancelled(self, job_id: str) -> None:
+        job = self.jobs.get(job_id)
+        if job is not None and job["cancel"].is_set():
+            raise JobCancelled()
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[dict]:
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        job["finished_event"].wait(timeout)
+        return self.status(job_id)
+
+    def depth(self) -> int:
+        return self.queued
+
+    def _finish(self, job: dict, status: str, result: Optional[dict] = None, error: Optional[str] = None) -> None:
+        job.update(status=status, result=result, error=error, finished=time.time())
+        try:
+            discard_upload(job["params"].pop("source", None))  # Spool-Datei nicht länger als nötig halten
+            METRICS.inc("jobs_total", status=status)
+            if status == "done" and job["started"]:
+                METRICS.observe("job_seconds", job["finished"] - job["started"])
+        finally:
+            # Wartende (JOBS.wait, SSE) immer freigeben, auch wenn das Aufräumen scheitert
+            job["finished_event"].set()
+            EVENTS.publish(job["id"], status, result if status == "done" else {"error": error})
+
+    def _worker(self) -> None:
+        while True:
+            job_id = self.queue.get()
+            try:
+                with self.lock:
+                    job = self.jobs.get(job_id)
+                    if job is None or job["status"] != "queued":
+                        continue
+                    self.queued -= 1
+                    job.update(status="running", started=time.time())
+                    params = dict(job["params"])
+                try:
+                    result = _run_ocr_pipeline(job_id=job_id, **params)
+                except JobCancelled:
+                    _progress_finish(job_id, message="Abgebrochen.")
+                    with self.lock:
+                        self._finish(job, "cancelled", error="Abgebrochen.")
+                except Exception as e:
+                    _progress_finish(job_id, message="Fehler.")
+                    with self.lock:
+                        self._finish(job, "error", error=str(e))
+                else:
+                    with self.lock:
+                        self._finish(job, "done", result=result)
+            except Exception as e:
+                # der Worker-Thread darf nicht sterben, sonst bleibt die Queue stehen
+                print(f"Job {job_id}: Fehler beim Abschließen:", e)
+            finally:
+                self.queue.task_done()
+
+JOBS = JobQueue(JOB_WORKERS, JOB_QUEUE_DEPTH)
+METRICS.gauge("queue_depth", JOBS.depth, "Wartende Jobs in der Job-Queue")
+METRICS.gauge("jobs_running", lambda: sum(1 for j in list(JOBS.jobs.values()) if j["status"] == "running"),
+              "Laufende Jobs")
 
 # --- Flask Routes -------------------------------------------------------------
 
@@ -341,87 +1849,206 @@ def index():
 @app.route("/api/progress", methods=["GET"])
 def api_progress():
     job_id = request.args.get("job") or "default"
-    p = PROGRESS.get(job_id)
-    if not p:
-        return jsonify({"ok": True, "percent": 0, "done": 0, "total": 0, "eta_seconds": 0, "message": "Warte auf Start…"})
-    percent = 0 if p["total"] == 0 else int(100 * p["done"] / max(1, p["total"]))
-    return jsonify({
-        "ok": True,
-        "percent": percent,
-        "done": int(p["done"]),
-        "total": int(p["total"]),
-        "eta_seconds": round(p["eta"], 1),
-        "message": p.get("message", "")
-    })
+    return jsonify({"ok": True, **progress_view(PROGRESS_STORE.get(job_id))})
+
+# Marker im Werkordner, geschrieben nach dem ZIP: das Werk ist vollständig
+DONE_MARKER = ".done.json"
+
+# --- Checkpoints ---------------------------------------------------------------
+
+# Jede per OCR gelesene Seite landet sofort in work_dir/.checkpoint/page-NNNNN.txt;
+# meta.json hält fest, zu welcher Eingabe und welchen OCR-Einstellungen sie gehören.
+# Ein Lauf mit resume übernimmt die Seiten, wenn meta.json passt.
+CHECKPOINT_DIR = ".checkpoint"
+
+def _atomic_write(path: Path, content: str) -> None:
+    tmp = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+    tmp.write_text(content, encoding="utf-8")
+    os.replace(tmp, path)
+
+def _file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(UPLOAD_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def checkpoint_meta(source: Path, lang: str, preprocess: str, target_dpi: int) -> dict:
+    return {
+        "source_sha256": _file_sha256(source),
+        "lang": lang,
+        "ocr_config": OCR_CONFIG,
+        "preprocess": preprocess,
+        "target_dpi": target_dpi,
+        "text_layer": PDF_TEXT_LAYER,
+    }
+
+def checkpoint_load(ckpt_dir: Path, meta: dict) -> Optional[Dict[int, str]]:
+    """Seiten eines früheren Laufs (seitenindex → text); None ohne passenden Checkpoint."""
+    try:
+        stored = json.loads((ckpt_dir / "meta.json").read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if stored != meta:
+        return None
+    pages: Dict[int, str] = {}
+    for f in ckpt_dir.glob("page-*.txt"):
+        pages[int(f.stem[len("page-"):])] = f.read_text(encoding="utf-8")
+    return pages
+
+def checkpoint_start(ckpt_dir: Path, meta: dict) -> None:
+    ensure_dir(ckpt_dir)
+    _atomic_write(ckpt_dir / "meta.json", json.dumps(meta))
+
+def checkpoint_page(ckpt_dir: Path, idx: int, text: str) -> None:
+    _atomic_write(ckpt_dir / f"page-{idx:05d}.txt", text)
+
+# ------------------------------------------------------------------------------
 
-def _run_ocr_pipeline(raw_bytes: bytes, filename: str, script: str, doc_type: str, work_name: str, job_id: str):
+def _run_ocr_pipeline(source: Path, filename: str, script: str, doc_type: str, work_name: str, job_id: str,
+                      zip_level: Optional[int] = None, preprocess: Optional[str] = None,
+                      target_dpi: Optional[int] = None, out_root: Optional[Path] = None,
+                      zip_dir: Optional[Path] = None, resume: bool = False):
     # Basis-Ausgabeordner
-    out_root = Path("output")
+    out_root = Path(out_root or "output")
     work_dir = out_root / work_name
-    if work_dir.exists():
-        shutil.rmtree(work_dir)
-    ensure_dir(work_dir)
-
-    # PDF / Bild lesen
-    pages: List[Image.Image] = []
+    ckpt_dir = work_dir / CHECKPOINT_DIR
+    lang = tesseract_lang("frak" if script == "frak" else "deu")
+    preprocess = preprocess or OCR_PREPROCESS
+    target_dpi = target_dpi or OCR_TARGET_DPI
+
+    # resume: passende Checkpoint-Seiten übernehmen, alles andere neu erzeugen
+    meta = checkpoint_meta(source, lang, preprocess, target_dpi)
+    resumed = checkpoint_load(ckpt_dir, meta) if resume else None
+    if resumed is None:
+        if work_dir.exists():
+            shutil.rmtree(work_dir)
+        checkpoint_start(ckpt_dir, meta)
+        resumed = {}
+    else:
+        for child in work_dir.iterdir():
+            if child.name == CHECKPOINT_DIR:
+                continue
+            if child.is_dir():
+                shutil.rmtree(child)
+            else:
+                child.unlink()
+
+    # Dauer je Stufe und Teilschritt (Sekunden) für Ergebnis, Batch-Report und /metrics
+    timer = StageTimer("read")
+    def enter_stage(stage: str):
+        timer.enter(stage)
+        if stage != "done":
+            _progress_stage(job_id, stage)
+
+    # PDF / Bild lesen – PDF-Seiten werden erst beim OCR-Durchlauf gerastert,
+    # Seiten mit brauchbarer Textebene gar nicht
+    # Seiten aus dem OCR-Cache (Schlüssel über den Datei-Hash) ebenfalls nicht rastern
+    layer_texts: Dict[int, str] = {}
+    cached: Dict[int, str] = {}
+    variant = ocr_cache_variant(preprocess, target_dpi)
     try:
         if filename.lower().endswith(".pdf"):
-            pages = pdf_to_images(raw_bytes)
+            render_dpi = PDF_RENDER_DPI
+            total_pages = pdf_page_count(source)
+            if PDF_TEXT_LAYER:
+                with timer.step("text_layer"):
+                    layer_texts = pdf_text_layer(source)
+            todo = [i for i in range(total_pages) if i not in layer_texts and i not in resumed]
+            cached = ocr_cache_lookup(meta["source_sha256"], todo, render_dpi, lang, variant)
+            skip = set(layer_texts) | set(resumed) | set(cached)
+            pages: Iterator[Tuple[int, PageSource]]
+            if OCR_WORKERS > 1:
+                # nur (pfad, seite, dpi) an den Pool – jeder Worker rastert seine Seite selbst
+                pages = iter([(i, PdfPage(str(source), i, render_dpi)) for i in range(total_pages) if i not in skip])
+            else:
+                pages = iter_pdf_pages(source, dpi=render_dpi, skip=skip)
         else:
-            pages = [Image.open(io.BytesIO(raw_bytes))]
+            render_dpi = 0
+            total_pages = 1
+            with Image.open(source):
+                pass  # nur den Kopf prüfen – dekodiert wird im OCR-Worker
+            if 0 not in resumed:
+                cached = ocr_cache_lookup(meta["source_sha256"], [0], render_dpi, lang, variant)
+            pages = iter([] if 0 in resumed or 0 in cached else [(0, Path(source))])
     except Exception as e:
         raise RuntimeError(f"Lesefehler: {e}")
 
-    _progress_init(job_id, total=len(pages), message="Seiten vorbereiten…")
-
-    lang = tesseract_lang("frak" if script == "frak" else "deu")
-    full_text_list = []
-    for i, img in enumerate(pages, 1):
-        t0 = time.time()
-        txt = ocr_image(img, lang=lang)
-        full_text_list.append(txt)
-        _progress_step(job_id, 1, message=f"OCR {i}/{len(pages)} (⌀/ETA wird berechnet)…")
-        # (kleiner Sleep 0,0x verhindert, dass Browser-Polling zu dicht ist)
-        time.sleep(0.01)
-
-    full_text = "\n\n".join(full_text_list).strip()
+    _progress_init(job_id, total=total_pages, message="Seiten vorbereiten…")
+    enter_stage("ocr")
+
+    page_texts = {**layer_texts, **resumed, **cached}
+    done_pages = len(page_texts)
+    if done_pages:
+        _progress_step(job_id, done_pages,
+                       message=f"Übernommen: {len(layer_texts)} Seiten Textebene, {len(resumed)} aus Checkpoint, "
+                               f"{len(cached)} aus dem OCR-Cache…")
+
+    def page_done(idx: int, text: str):
+        nonlocal done_pages
+        checkpoint_page(ckpt_dir, idx, text)
+        done_pages += 1
+        JOBS.check_cancelled(job_id)
+        _progress_step(job_id, 1, message=f"OCR {done_pages}/{total_pages} (⌀/ETA wird berechnet)…")
+
+    ocr_stats: Dict[str, int] = {}
+    ocr_texts = ocr_pages(timer.iterate("rasterize", pages), lang=lang, on_page=page_done,
+                          preprocess=preprocess, target_dpi=target_dpi, stats=ocr_stats,
+                          source_sha256=meta["source_sha256"], dpi=render_dpi)
+    ocr_cache_evict()
+    METRICS.inc("pages_total", len(layer_texts), source="text_layer")
+    METRICS.inc("pages_total", len(resumed), source="checkpoint")
+    METRICS.inc("pages_total", len(cached), source="cache")
+
+    # ocr_pages liefert nach Seite sortiert – mit Textebene, Checkpoint und Cache zusammenführen
+    ocr_indices = [i for i in range(total_pages) if i not in page_texts]
+    page_texts.update(zip(ocr_indices, ocr_texts))
+    full_text = "\n\n".join(page_texts[i] for i in sorted(page_texts)).strip()
     if not full_text:
         raise RuntimeError("OCR ergab keinen Text.")
 
+    enter_stage("text")
+
     # Oberes README mit kurzer Info
     write_file(work_dir / "README.md",
                f"# {work_name}\n\nErstellt am {datetime.now().strftime('%Y-%m-%d %H:%M')} mit OCR-Extractor.\n\n")
 
-    summary = {"created": [], "register": []}
+    summary = {"created": [], "register": [],
+               "pages": {"total": total_pages, "text_layer": len(layer_texts), "resumed": len(resumed),
+                         "ocr": ocr_stats["ocr"], "cache_hits": len(cached)}}
+    register = RegisterBuilder()
 
     if doc_type == "other":
-        entities = detect_entities(full_text)
-        annotated, used = annotate_text_with_links(
-            full_text,
-            base_rel_to_register="register",
-            entities=entities
-        )
+        with timer.step("entities"):
+            entities = detect_entities(full_text)
+        with timer.step("annotate"):
+            annotated, used = annotate_text_with_links(
+                full_text,
+                base_rel_to_register="register",
+                entities=entities
+            )
         write_file(work_dir / "README.md",
                    (work_dir / "README.md").read_text(encoding="utf-8") + "\n\n" + annotated + "\n")
-        update_register_files(
-            work_dir,
+        register.add(
             used,
             mention_info=("README.md", "./README.md", "Haupttext")
         )
         summary["created"].append("README.md (voller Text)")
     else:
-        year_map = split_annals_by_year(full_text)
+        with timer.step("split"):
+            year_map = split_annals_by_year(full_text)
         if not year_map:
-            entities = detect_entities(full_text)
-            annotated, used = annotate_text_with_links(
-                full_text,
-                base_rel_to_register="register",
-                entities=entities
-            )
+            with timer.step("entities"):
+                entities = detect_entities(full_text)
+            with timer.step("annotate"):
+                annotated, used = annotate_text_with_links(
+                    full_text,
+                    base_rel_to_register="register",
+                    entities=entities
+                )
             write_file(work_dir / "README.md",
                        (work_dir / "README.md").read_text(encoding="utf-8") + "\n\n" + annotated + "\n")
-            update_register_files(
-                work_dir,
+            register.add(
                 used,
                 mention_info=("README.md", "./README.md", "Haupttext")
             )
@@ -432,33 +2059,102 @@ def _run_ocr_pipeline(raw_bytes: bytes, filename: str, script: str, doc_type: st
 
             items = list(year_map.items())
             # Fortschritt neu kalibrieren: OCR war 100%, jetzt wir zählen weiter für Jahresverarbeitung
-            PROGRESS[job_id]["total"] = PROGRESS[job_id]["done"] + len(items)
-            for idx, (y, text) in enumerate(items, 1):
-                entities = detect_entities(text)
-                annotated, used = annotate_text_with_links(
-                    text,
-                    base_rel_to_register="../../register",
-                    entities=entities
-                )
+            _progress_extend(job_id, len(items))
+            section_entities = timer.iterate("entities", detect_entities_batch(text for _, text in items))
+            for idx, ((y, text), entities) in enumerate(zip(items, section_entities), 1):
+                JOBS.check_cancelled(job_id)
+                with timer.step("annotate"):
+                    annotated, used = annotate_text_with_links(
+                        text,
+                        base_rel_to_register="../../register",
+                        entities=entities
+                    )
                 year_dir = years_root / y
                 ensure_dir(year_dir)
                 write_file(year_dir / "README.md", f"# {y}\n\n{annotated}\n")
-                update_register_files(
-                    work_dir,
+                register.add(
                     used,
                     mention_info=(f"jahre/{y}/README.md", f"../jahre/{y}/README.md", y)
                 )
                 summary["created"].append(f"jahre/{y}/README.md")
                 _progress_step(job_id, 1, message=f"Schreibe Jahresordner {idx}/{len(items)}…")
 
+    enter_stage("register")
+    register.write(work_dir)
+    index = _get_global_index(out_root)
+    if index is not None:
+        with timer.step("index"):
+            index.replace_work(work_name, register.postings())
+
     # Ergebnis bündeln als ZIP zum Download
-    zip_bytes = make_zip_of_folder(work_dir)
+    enter_stage("zip")
     zip_name = f"{work_name}.zip"
-    zip_path = Path(tempfile.gettempdir()) / zip_name
-    zip_path.write_bytes(zip_bytes)
-
+    make_zip_of_folder(work_dir, Path(zip_dir or tempfile.gettempdir()) / zip_name, level=zip_level,
+                       exclude=(CHECKPOINT_DIR,))
+    shutil.rmtree(ckpt_dir, ignore_errors=True)
+    enter_stage("done")
+
+    result = {"zip": f"/download/{zip_name}", "created": summary["created"], "pages": summary["pages"],
+              "timings": timer.report()}
+    source_stat = Path(source).stat()
+    write_file(work_dir / DONE_MARKER, json.dumps(
+        {"source": filename, "size": source_stat.st_size, "mtime_ns": source_stat.st_mtime_ns,
+         "sha256": meta["source_sha256"], "finished": time.time(), **result}, ensure_ascii=False
+    ))
     _progress_finish(job_id, message="Fertig.")
-    return {"zip": f"/download/{zip_name}", "created": summary["created"]}
+    return result
+
+def _job_params_from_request():
+    """Liest das Multipart-Formular; liefert (params, None) oder (None, fehler_response)."""
+    if "file" not in request.files:
+        return None, (jsonify({"ok": False, "error": "Bitte eine Datei hochladen."}), 400)
+
+    f = request.files["file"]
+    if not f.filename:
+        return None, (jsonify({"ok": False, "error": "Leere Datei."}), 400)
+
+    zip_level = request.form.get("zip_level")
+    if zip_level is not None and zip_level != "":
+        if not zip_level.isdigit() or int(zip_level) > 9:
+            return None, (jsonify({"ok": False, "error": "zip_level muss 0–9 sein (0 = unkomprimiert)."}), 400)
+
+    preprocess = request.form.get("preprocess") or OCR_PREPROCESS
+    if preprocess not in PREPROCESS_MODES:
+        return None, (jsonify({"ok": False, "error": f"preprocess muss einer von {', '.join(PREPROCESS_MODES)} sein."}), 400)
+    target_dpi = request.form.get("target_dpi")
+    if target_dpi and (not target_dpi.isdigit() or not 72 <= int(target_dpi) <= 1200):
+        return None, (jsonify({"ok": False, "error": "target_dpi muss zwischen 72 und 1200 liegen."}), 400)
+
+    try:
+        source = spool_upload(f)
+    except UploadTooLarge as e:
+        return None, (jsonify({"ok": False, "error": str(e)}), 413)
+
+    params = {
+        "source": source,
+        "filename": f.filename,
+        "script": request.form.get("script", "deu"),
+        "doc_type": request.form.get("doc_type", "other"),
+        "work_name": secure_folder_name(request.form.get("work_name", "")),
+        "zip_level": int(zip_level) if zip_level else None,
+        "preprocess": preprocess,
+        "target_dpi": int(target_dpi) if target_dpi else None,
+        "resume": request.form.get("resume", "").lower() in ("1", "true", "on", "yes"),
+    }
+    return params, None
+
+def _submit_job(job_id: str, params: dict):
+    """Reiht den Job ein; liefert (status, None) oder (None, fehler_response)."""
+    try:
+        return JOBS.submit(job_id, params), None
+    except queue.Full:
+        discard_upload(params["source"])
+        resp = jsonify({"ok": False, "error": "Warteschlange voll – bitte später erneut versuchen."})
+        resp.headers["Retry-After"] = "30"
+        return None, (resp, 429)
+    except ValueError as e:
+        discard_upload(params["source"])
+        return None, (jsonify({"ok": False, "error": str(e)}), 409)
 
 @app.route("/api/ocr", methods=["POST"])
 def api_ocr():
@@ -468,45 +2164,143 @@ def api_ocr():
       - script: 'deu' | 'frak'
       - doc_type: 'annals' | 'other'
       - work_name: Ordnername
+      - zip_level: optional, 0 (STORED) bis 9
+      - preprocess: optional, 'gray' | 'scale' | 'full'; target_dpi: optional
+      - resume: optional, '1' = Seiten aus dem Checkpoint eines abgebrochenen Laufs übernehmen
     Optional: ?stream=1 für SSE-Progress.
+    Der Job läuft in der Job-Queue; dieser Endpoint wartet auf das Ergebnis.
+    Für asynchrone Verarbeitung: POST /api/jobs.
     """
-    if "file" not in request.files:
-        return jsonify({"ok": False, "error": "Bitte eine Datei hochladen."}), 400
-
-    f = request.files["file"]
-    if not f.filename:
-        return jsonify({"ok": False, "error": "Leere Datei."}), 400
-
-    script = request.form.get("script", "deu")
-    doc_type = request.form.get("doc_type", "other")
-    work_name = secure_folder_name(request.form.get("work_name", ""))
+    params, error = _job_params_from_request()
+    if error:
+        return error
 
     job_id = request.form.get("job") or str(uuid.uuid4())
+    _, error = _submit_job(job_id, params)
+    if error:
+        return error
 
-    raw_bytes = f.read()
-    filename = f.filename
-
-    # Streaming (SSE): verarbeitet synchron, sendet aber Fortschritt live
+    # Streaming (SSE): Fortschritt wird live gepusht, done/error wie bisher als Klartext
     if request.args.get("stream") == "1":
         @stream_with_context
         def generate():
             yield f"event: start\ndata: {job_id}\n\n"
-            try:
-                result = _run_ocr_pipeline(raw_bytes, filename, script, doc_type, work_name, job_id)
-                yield f"event: done\ndata: {result['zip']}\n\n"
-            except Exception as e:
-                err = str(e).replace("\n", " ")
-                yield f"event: error\ndata: {err}\n\n"
-        return Response(generate(), mimetype="text/event-stream")
+            for event_id, event, data in EVENTS.stream(job_id):
+                if event == "done":
+                    yield _sse_format(event_id, "done", data["zip"])
+                elif event in ("error", "cancelled"):
+                    err = (data.get("error") or "Unbekannter Fehler").replace("\n", " ")
+                    yield _sse_format(event_id, "error", err)
+                else:
+                    yield _sse_format(event_id, event, data)
+        return Response(generate(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
 
     # Normale (nicht-streamende) Antwort – Fortschritt kann parallel via /api/progress polled werden
+    status = JOBS.wait(job_id)
+    if status["status"] != "done":
+        return jsonify({"ok": False, "error": status["error"] or "Unbekannter Fehler"}), 400
+    result = JOBS.result(job_id)
+    return jsonify({"ok": True, "job": job_id, "summary": result})
+
+@app.route("/api/jobs", methods=["POST"])
+def api_jobs_submit():
+    """Wie /api/ocr, kehrt aber sofort mit der Job-ID zurück (HTTP 202)."""
+    params, error = _job_params_from_request()
+    if error:
+        return error
+    job_id = request.form.get("job") or str(uuid.uuid4())
+    status, error = _submit_job(job_id, params)
+    if error:
+        return error
+    return jsonify({"ok": True, "job": status}), 202
+
+@app.route("/api/jobs/<job_id>", methods=["GET"])
+def api_jobs_status(job_id):
+    status = JOBS.status(job_id)
+    if status is None:
+        return jsonify({"ok": False, "error": "Job nicht gefunden."}), 404
+    return jsonify({"ok": True, "job": status})
+
+@app.route("/api/jobs/<job_id>/events", methods=["GET"])
+def api_jobs_events(job_id):
+    """
+    SSE-Stream der Job-Events: progress, stage, done, error, cancelled.
+    Nach Verbindungsabbruch setzt der Browser mit Last-Event-ID fort.
+    """
+    if JOBS.status(job_id) is None:
+        return jsonify({"ok": False, "error": "Job nicht gefunden."}), 404
     try:
-        _progress_init(job_id, total=1, message="Initialisiere…")
-        result = _run_ocr_pipeline(raw_bytes, filename, script, doc_type, work_name, job_id)
-        return jsonify({"ok": True, "job": job_id, "summary": {"created": result["created"], "zip": result["zip"]}})
-    except Exception as e:
-        _progress_finish(job_id, message="Fehler.")
-        return jsonify({"ok": False, "error": str(e)}), 400
+        last_id = int(request.headers.get("Last-Event-ID") or request.args.get("last_event_id") or 0)
+    except ValueError:
+        last_id = 0
+
+    @stream_with_context
+    def generate():
+        yield "retry: 3000\n\n"
+        for event_id, event, data in EVENTS.stream(job_id, last_id):
+            yield _sse_format(event_id, event, data)
+    return Response(generate(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route("/api/jobs/<job_id>", methods=["DELETE"])
+@app.route("/api/jobs/<job_id>/cancel", methods=["POST"])
+def api_jobs_cancel(job_id):
+    if JOBS.status(job_id) is None:
+        return jsonify({"ok": False, "error": "Job nicht gefunden."}), 404
+    if not JOBS.cancel(job_id):
+        return jsonify({"ok": False, "error": "Job ist bereits beendet."}), 409
+    return jsonify({"ok": True, "job": JOBS.status(job_id)})
+
+@app.route("/api/jobs/<job_id>/result", methods=["GET"])
+def api_jobs_result(job_id):
+    status = JOBS.status(job_id)
+    if status is None:
+        return jsonify({"ok": False, "error": "Job nicht gefunden."}), 404
+    if status["status"] in JobQueue.ACTIVE:
+        return jsonify({"ok": False, "error": "Job ist noch nicht fertig.", "job": status}), 409
+    if status["status"] != "done":
+        return jsonify({"ok": False, "error": status["error"], "job": status}), 400
+    result = JOBS.result(job_id)
+    return jsonify({"ok": True, "job": status, "summary": result})
+
+@app.route("/api/search", methods=["GET"])
+def api_search():
+    """
+    Werkübergreifende Registersuche:
+      - q: Suchbegriff (alle Wörter müssen vorkommen)
+      - kind: optional, 'personen' | 'orte' | 'worte' | 'schlagworte'
+      - prefix: optional, '1' (Standard) = Wortanfänge, '0' = ganze Wörter
+      - limit: optional, max. Entitäten (1–200, Standard 20)
+    """
+    index = _get_global_index()
+    if index is None:
+        return jsonify({"ok": False, "error": "Globaler Register-Index ist deaktiviert oder nicht verfügbar."}), 404
+    q = request.args.get("q", "").strip()
+    if not q:
+        return jsonify({"ok": False, "error": "Parameter q fehlt."}), 400
+    kind = request.args.get("kind") or None
+    if kind and kind not in REGISTER_KINDS:
+        return jsonify({"ok": False, "error": f"kind muss einer von {', '.join(REGISTER_KINDS)} sein."}), 400
+    limit = request.args.get("limit", "20")
+    if not limit.isdigit() or not 1 <= int(limit) <= 200:
+        return jsonify({"ok": False, "error": "limit muss zwischen 1 und 200 liegen."}), 400
+    prefix = request.args.get("prefix", "1").lower() not in ("0", "false", "no", "off")
+
+    t0 = time.perf_counter()
+    results = index.search(q, kind=kind, prefix=prefix, limit=int(limit))
+    return jsonify({"ok": True, "query": q, "results": results,
+                    "took_ms": round((time.perf_counter() - t0) * 1000, 2)})
+
+@app.errorhandler(413)
+def upload_too_large(_e):
+    return jsonify({"ok": False, "error": f"Datei ist größer als {UPLOAD_MAX_MB} MB."}), 413
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """Prometheus-Textformat; Werte gelten je Prozess."""
+    if not METRICS.enabled:
+        return jsonify({"ok": False, "error": "Metriken sind deaktiviert (METRICS_ENABLED=0)."}), 404
+    return Response(METRICS.render(), mimetype="text/plain; version=0.0.4")
 
 @app.route("/download/<zipname>", methods=["GET"])
 def download(zipname):
@@ -517,10 +2311,32 @@ def download(zipname):
 
 # ------------------------------------------------------------------------------
 
+def _startup() -> None:
+    # OCR-Pool-Prozesse und der forkserver importieren das Modul neu: dort weder
+    # aufräumen noch Modelle vorladen noch loggen. Der forkserver hat keinen
+    # parent_process, führt aber das Hauptmodul des Elternprozesses als
+    # __mp_main__ aus – nur dann ist __mp_main__ nicht zugleich __main__.
+    if (multiprocessing.parent_process() is not None
+            or sys.modules.get("__mp_main__", sys.modules["__main__"]) is not sys.modules["__main__"]):
+        return
+    prune_uploads(JOB_RESULT_TTL)
+    if PRELOAD_MODELS:
+        _pdf_backend()
+        _get_spacy_nlp()
+    spacy_state = (SPACY_MODEL if _SPACY_NLP else "nicht verfügbar") if _SPACY_CHECKED else "lazy"
+    pdf_state = (_IMAGES_FROM_PDF_BACKEND or "nicht verfügbar") if _PDF_BACKEND_CHECKED else "lazy"
+    print(f"OCR-Extractor geladen in {time.perf_counter() - _IMPORT_T0:.2f}s "
+          f"(spaCy: {spacy_state}, PDF: {pdf_state}, OCR-Worker: {OCR_WORKERS})")
+
+_startup()
+
 if __name__ == "__main__":
     # Optional: expliziten Tesseract-Pfad aus Umgebungsvariable verwenden
     if os.environ.get("TESSERACT_CMD"):
         pytesseract.pytesseract.tesseract_cmd = os.environ["TESSERACT_CMD"]
 
+    # Sprachliste einmalig beim Start ermitteln
+    tesseract_languages()
+
     os.makedirs("output", exist_ok=True)
     app.run(host="0.0.0.0", port=8000, debug=True)
@@ -0,0 +1,224 @@
+# batch.py
+"""
+Stapelverarbeitung ohne Webserver: liest Dateien aus Verzeichnissen oder
+einem Manifest, verarbeitet sie parallel mit derselben Pipeline wie
+/api/ocr nach output/<werkname> und schreibt am Ende einen Durchsatz-Report.
+
+    python batch.py scans/ --script frak --doc-type annals --jobs 4
+    python batch.py --manifest werke.csv --report output/batch-report.json
+
+Manifest (CSV mit Kopfzeile): path,work_name,script,doc_type – nur path ist
+Pflicht, relative Pfade gelten relativ zum Manifest. Werke mit Abschluss-
+Marker (.done.json) aus derselben Datei (Name, Größe, mtime bzw. sha256)
+werden übersprungen, außer mit --force; --resume setzt abgebrochene Werke an
+ihrem Checkpoint fort.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import app
+
+INPUT_SUFFIXES = {".pdf", ".png", ".jpg", ".jpeg", ".tif", ".tiff"}
+
+# --- Eingaben sammeln ---------------------------------------------------------
+
+def _entry(path: Path, work_name: Optional[str] = None, script: str = "", doc_type: str = "") -> Dict[str, str]:
+    return {
+        "path": str(path),
+        "work_name": app.secure_folder_name(work_name or path.stem),
+        "script": script,
+        "doc_type": doc_type,
+    }
+
+def collect_inputs(paths: List[str]) -> List[Dict[str, str]]:
+    """Dateien und Verzeichnisse (rekursiv, sortiert) → Einträge."""
+    entries = []
+    for raw in paths:
+        p = Path(raw)
+        if p.is_dir():
+            files = sorted(f for f in p.rglob("*") if f.is_file() and f.suffix.lower() in INPUT_SUFFIXES)
+            entries.extend(_entry(f) for f in files)
+        elif p.is_file():
+            entries.append(_entry(p))
+        else:
+            raise SystemExit(f"Nicht gefunden: {raw}")
+    return entries
+
+def read_manifest(manifest: Path) -> List[Dict[str, str]]:
+    entries = []
+    with manifest.open(newline="", encoding="utf-8") as fh:
+        for row in csv.DictReader(fh):
+            path = Path(row["path"])
+            if not path.is_absolute():
+                path = manifest.parent / path
+            entries.append(_entry(path, row.get("work_name"), row.get("script") or "", row.get("doc_type") or ""))
+    return entries
+
+def dedupe_work_names(entries: List[Dict[str, str]]) -> None:
+    # gleiche Dateinamen in verschiedenen Ordnern dürfen sich nicht überschreiben
+    seen: Dict[str, int] = {}
+    for e in entries:
+        name = e["work_name"]
+        if name in seen:
+            seen[name] += 1
+            e["work_name"] = f"{name}_{seen[name]}"
+        else:
+            seen[name] = 1
+
+# --- Verarbeitung -------------------------------------------------------------
+
+def is_completed(out_root: Path, entry: Dict[str, str]) -> bool:
+    """
+    Fertig heißt: Marker vorhanden und aus genau dieser Datei (Name, Größe,
+    sha256) erzeugt. Bei unveränderter Größe und mtime wird nicht gehasht –
+    sonst müsste jeder Lauf alle fertigen Bände komplett lesen.
+    """
+    marker = out_root / entry["work_name"] / app.DONE_MARKER
+    if not marker.exists():
+        return False
+    path = Path(entry["path"])
+    try:
+        done = json.loads(marker.read_text(encoding="utf-8"))
+        st = path.stat()
+        if done.get("source") != path.name or done.get("size") != st.st_size:
+            return False
+        if done.get("mtime_ns") == st.st_mtime_ns:
+            return True
+        return done.get("sha256") == app._file_sha256(path)
+    except (OSError, ValueError):
+        return False
+
+def process_entry(entry: Dict[str, str], args: argparse.Namespace) -> dict:
+    job_id = f"batch-{uuid.uuid4()}"
+    t0 = time.perf_counter()
+    try:
+        result = app._run_ocr_pipeline(
+            source=Path(entry["path"]),
+            filename=Path(entry["path"]).name,
+            script=entry["script"] or args.script,
+            doc_type=entry["doc_type"] or args.doc_type,
+            work_name=entry["work_name"],
+            job_id=job_id,
+            zip_level=args.zip_level,
+            preprocess=args.preprocess,
+            target_dpi=args.target_dpi,
+            out_root=args.out,
+            zip_dir=args.out,
+            resume=args.resume,
+        )
+        status, error = "done", None
+    except Exception as e:
+        result, status, error = {}, "error", str(e)
+    finally:
+        # Batch-Jobs haben keine Zuhörer: Event-Kanal sofort freigeben
+        app.EVENTS.reset(job_id)
+    return {
+        "work_name": entry["work_name"],
+        "source": entry["path"],
+        "status": status,
+        "error": error,
+        "seconds": round(time.perf_counter() - t0, 3),
+        "pages": result.get("pages"),
+        "timings": result.get("timings", {}),
+    }
+
+# --- Report -------------------------------------------------------------------
+
+def build_report(results: List[dict], wall_seconds: float, jobs: int) -> dict:
+    done = [r for r in results if r["status"] == "done"]
+    pages = sum(r["pages"]["total"] for r in done)
+    ocr_pages = sum(r["pages"]["ocr"] for r in done)
+    stages: Dict[str, float] = {}
+    for r in done:
+        for stage, secs in r["timings"].items():
+            stages[stage] = round(stages.get(stage, 0.0) + secs, 3)
+    return {
+        "files": len(results),
+        "done": len(done),
+        "skipped": sum(1 for r in results if r["status"] == "skipped"),
+        "failed": sum(1 for r in results if r["status"] == "error"),
+        "jobs": jobs,
+        "wall_seconds": round(wall_seconds, 3),
+        "pages": pages,
+        "ocr_pages": ocr_pages,
+        "pages_per_sec": round(pages / wall_seconds, 3) if wall_seconds > 0 else 0.0,
+        # Summe über alle Werke (bei --jobs > 1 größer als die Wanduhrzeit)
+        "stage_seconds": stages,
+        "results": results,
+    }
+
+def print_report(report: dict) -> None:
+    print(f"\n{report['done']} fertig, {report['skipped']} übersprungen, {report['failed']} fehlgeschlagen "
+          f"von {report['files']} Dateien in {report['wall_seconds']:.1f} s")
+    print(f"{report['pages']} Seiten ({report['ocr_pages']} per OCR), {report['pages_per_sec']:.2f} Seiten/s")
+    for stage, secs in report["stage_seconds"].items():
+        print(f"  {stage:<10}{secs:10.1f} s")
+    for r in report["results"]:
+        if r["status"] == "error":
+            print(f"  FEHLER {r['source']}: {r['error']}")
+
+# ------------------------------------------------------------------------------
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("inputs", nargs="*", help="Dateien oder Verzeichnisse (PDF/Bilder)")
+    ap.add_argument("--manifest", type=Path, help="CSV mit path,work_name,script,doc_type")
+    ap.add_argument("--out", type=Path, default=Path("output"), help="Ausgabe-Wurzel (Standard: output)")
+    ap.add_argument("--script", choices=("deu", "frak"), default="deu")
+    ap.add_argument("--doc-type", choices=("annals", "other"), default="annals")
+    ap.add_argument("--jobs", type=int, default=app.JOB_WORKERS, help="gleichzeitig verarbeitete Dateien")
+    ap.add_argument("--preprocess", choices=app.PREPROCESS_MODES, default=None)
+    ap.add_argument("--target-dpi", type=int, default=None)
+    ap.add_argument("--zip-level", type=int, choices=range(10), default=None, metavar="0-9")
+    ap.add_argument("--force", action="store_true", help="auch bereits fertige Werke neu verarbeiten")
+    ap.add_argument("--resume", action="store_true",
+                    help="abgebrochene Werke ab der ersten fehlenden Seite fortsetzen (Checkpoints)")
+    ap.add_argument("--report", type=Path, help="Report-Datei (Standard: <out>/batch-report.json)")
+    args = ap.parse_args(argv)
+
+    entries = collect_inputs(args.inputs)
+    if args.manifest:
+        entries.extend(read_manifest(args.manifest))
+    if not entries:
+        ap.error("keine Eingabedateien")
+    dedupe_work_names(entries)
+
+    if os.environ.get("TESSERACT_CMD"):
+        app.pytesseract.pytesseract.tesseract_cmd = os.environ["TESSERACT_CMD"]
+    app.ensure_dir(args.out)
+
+    results: List[dict] = []
+    todo = []
+    for e in entries:
+        if not args.force and is_completed(args.out, e):
+            results.append({"work_name": e["work_name"], "source": e["path"], "status": "skipped",
+                            "error": None, "seconds": 0.0, "pages": None, "timings": {}})
+        else:
+            todo.append(e)
+    print(f"{len(todo)} zu verarbeiten, {len(results)} bereits fertig")
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        futures = [pool.submit(process_entry, e, args) for e in todo]
+        for n, fut in enumerate(as_completed(futures), 1):
+            r = fut.result()
+            results.append(r)
+            print(f"[{n}/{len(todo)}] {r['status']:<6} {r['work_name']} ({r['seconds']:.1f} s)")
+    report = build_report(results, time.perf_counter() - t0, args.jobs)
+
+    report_path = args.report or args.out / "batch-report.json"
+    app.write_file(report_path, json.dumps(report, ensure_ascii=False, indent=2))
+    print_report(report)
+    print(f"Report: {report_path}")
+    return 1 if report["failed"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+# benchmarks/bench_linker.py
+"""
+Vergleicht den Single-Pass-Linker (app.annotate_text_with_links) mit der
+früheren Variante (eine Regex pro Entität, search + sub über den ganzen Text)
+auf einem synthetischen Text ohne überlappende Einträge.
+
+    python benchmarks/bench_linker.py --words 3000 --chars 200000
+"""
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app import annotate_text_with_links, slugify  # noqa: E402
+
+
+def annotate_text_with_links_legacy(
+    text: str,
+    base_rel_to_register: str,
+    entities: Dict[str, Dict[str, List[str]]]
+) -> Tuple[str, Dict[str, Dict[str, List[str]]]]:
+    """Stand vor dem Single-Pass-Linker – nur als Referenz für den Benchmark."""
+    used = {"personen": {}, "orte": {}, "worte": {}, "schlagworte": {}}
+
+    def sorted_keys(d):
+        return sorted(d.keys(), key=lambda s: (-len(s), s.lower()))
+
+    for ent in sorted_keys(entities.get("schlagworte", {})):
+        slug = slugify(ent)
+        link = f"[{ent}]({base_rel_to_register}/schlagworte/{slug}.md)"
+        pattern = re.compile(rf"\b{re.escape(ent)}\b", flags=re.IGNORECASE)
+        if pattern.search(text):
+            text = pattern.sub(link, text)
+            used["schlagworte"].setdefault(ent, entities["schlagworte"][ent])
+
+    for kind in ("personen", "orte", "worte"):
+        for ent in sorted_keys(entities.get(kind, {})):
+            slug = slugify(ent)
+            link = f"[{ent}]({base_rel_to_register}/{kind}/{slug}.md)"
+            pattern = re.compile(rf"\b{re.escape(ent)}\b")
+            if pattern.search(text):
+                text = pattern.sub(link, text)
+                used[kind].setdefault(ent, entities[kind][ent])
+
+    return text, used
+
+
+SYLLABLES = ["ba", "be", "bo", "da", "de", "fa", "ga", "ha", "ka", "ke", "la", "le", "lo",
+             "ma", "mu", "na", "ne", "ra", "ri", "sa", "se", "ta", "te", "wa", "wi", "zu"]
+FILLER = ["und", "der", "die", "das", "in", "dem", "jahre", "wurde", "gebaut", "auch", "mit", "nach"]
+
+
+def _unique_names(rng: random.Random, n: int, taken: set) -> List[str]:
+    names = []
+    while len(names) < n:
+        name = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()
+        if name not in taken:
+            taken.add(name)
+            names.append(name)
+    return names
+
+
+def synthetic_case(words: int, chars: int, seed: int = 1) -> Tuple[str, Dict[str, Dict[str, List[str]]]]:
+    """Text + Entitäten ohne Überlappungen (kein Eintrag ist Teil eines anderen)."""
+    rng = random.Random(seed)
+    taken: set = set()
+    persons = ["Graf " + n for n in _unique_names(rng, max(1, words // 20), taken)]
+    places = _unique_names(rng, max(1, words // 20), taken)
+    nouns = _unique_names(rng, words, taken)
+    specials = ["Bier", "Zoll", "Mühle"]
+
+    vocab = persons + places + nouns + [s.lower() for s in specials] + specials
+    out: List[str] = []
+    size = 0
+    while size < chars:
+        sentence = [rng.choice(vocab) if rng.random() < 0.3 else rng.choice(FILLER) for _ in range(12)]
+        s = " ".join(sentence) + ". "
+        out.append(s)
+        size += len(s)
+    text = "".join(out)
+
+    snippet = ["Snippet."]
+    entities = {
+        "personen": {p: snippet for p in persons},
+        "orte": {p: snippet for p in places},
+        "worte": {w: snippet for w in nouns},
+        "schlagworte": {s: snippet for s in specials},
+    }
+    return text, entities
+
+
+def _as_ordered(result) -> Tuple[str, List]:
+    # Reihenfolge der verwendeten Einträge bestimmt die Registerausgabe
+    text, used = result
+    return text, [(kind, list(used[kind].items())) for kind in used]
+
+
+def _timed(fn, *args) -> Tuple[float, object]:
+    t0 = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - t0, result
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--words", type=int, default=2000, help="Anzahl Einträge im Wortregister")
+    ap.add_argument("--chars", type=int, default=100_000, help="Textlänge in Zeichen")
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+
+    text, entities = synthetic_case(args.words, args.chars, args.seed)
+    t_new, new = _timed(annotate_text_with_links, text, "../../register", entities)
+    t_old, old = _timed(annotate_text_with_links_legacy, text, "../../register", entities)
+
+    print(f"Text: {len(text)} Zeichen, Einträge: {sum(len(v) for v in entities.values())}")
+    print(f"legacy:      {t_old:8.3f} s")
+    print(f"single-pass: {t_new:8.3f} s  ({t_old / max(t_new, 1e-9):.1f}x)")
+    same = _as_ordered(new) == _as_ordered(old)
+    print("Ausgabe identisch:", same)
+    if not same:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
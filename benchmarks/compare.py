@@ -0,0 +1,68 @@
+# benchmarks/compare.py
+"""
+Vergleicht zwei Ergebnisdateien von benchmarks/run.py Stufe für Stufe
+(Median) und meldet Verschlechterungen über der Schwelle.
+
+    python benchmarks/compare.py before.json after.json --threshold 10
+
+Exit-Code 1, wenn eine Stufe um mehr als --threshold Prozent langsamer wurde.
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# Stufen unter dieser Dauer (Sekunden) sind Messrauschen und werden nicht bewertet
+MIN_SECONDS = 0.005
+
+
+def load(path: Path) -> dict:
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def rows(base: dict, new: dict):
+    for stage in list(base) + [s for s in new if s not in base]:
+        old_s = base.get(stage, {}).get("median")
+        new_s = new.get(stage, {}).get("median")
+        yield stage, old_s, new_s
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("base", type=Path)
+    ap.add_argument("new", type=Path)
+    ap.add_argument("--threshold", type=float, default=10.0, help="erlaubte Verschlechterung in Prozent")
+    args = ap.parse_args()
+
+    base, new = load(args.base), load(args.new)
+    if base["meta"]["params"] != new["meta"]["params"] or base["meta"]["ocr"] != new["meta"]["ocr"]:
+        print("Achtung: unterschiedliche Korpus-Parameter oder OCR-Modus – Zeiten nur bedingt vergleichbar.")
+    print(f"{base['meta'].get('git') or args.base.name} → {new['meta'].get('git') or args.new.name}\n")
+
+    regressions = []
+    print(f"{'Stufe':<12}{'vorher':>10}{'nachher':>10}{'Änderung':>10}")
+    for stage, old_s, new_s in rows(base["stages"], new["stages"]):
+        if old_s is None or new_s is None:
+            print(f"{stage:<12}{old_s if old_s is not None else '–':>10}{new_s if new_s is not None else '–':>10}")
+            continue
+        change = 100.0 * (new_s - old_s) / old_s if old_s > 0 else 0.0
+        flag = ""
+        if change > args.threshold and max(old_s, new_s) >= MIN_SECONDS:
+            flag = "  ← langsamer"
+            regressions.append(stage)
+        print(f"{stage:<12}{old_s:10.4f}{new_s:10.4f}{change:+9.1f}%{flag}")
+
+    old_t = base["stages"].get("pipeline", {}).get("timings", {})
+    new_t = new["stages"].get("pipeline", {}).get("timings", {})
+    if old_t and new_t:
+        print("\nPipeline je Stufe:")
+        for stage in list(old_t) + [s for s in new_t if s not in old_t]:
+            print(f"  {stage:<12}{old_t.get(stage, 0.0):10.4f}{new_t.get(stage, 0.0):10.4f}")
+
+    if regressions:
+        print(f"\nVerschlechtert (> {args.threshold:g} %): {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+# benchmarks/corpus.py
+"""
+Synthetische Annalen für die Benchmarks: Jahresabschnitte mit Personen,
+Orten und Schlagwörtern in der Form, die split_annals_by_year und
+detect_entities erwarten, dazu gerenderte Seitenbilder und ein PDF.
+Alles ist über den Seed reproduzierbar.
+"""
+import io
+import random
+import textwrap
+from typing import Dict, List, Tuple
+
+from PIL import Image, ImageDraw, ImageFont
+
+SYLLABLES = ["ber", "burg", "dorf", "ek", "fried", "gun", "hart", "hel", "lind", "mar", "mund",
+             "nau", "ot", "rad", "rich", "run", "stein", "tho", "wal", "wig", "win", "zel"]
+TITLES = ["Kaiser", "König", "Herzog", "Markgraf", "Graf", "Bischof", "Abt", "Landgraf"]
+PLACE_HINTS = ["Stadt", "Dorf", "Kloster", "Burg"]
+KEYWORDS = ["Bier", "Brauerei", "Stadtrat", "Domkapitel", "Pfarrer", "Gericht", "Zoll", "Markt",
+            "Wein", "Mühle", "Hospital", "Abgabe"]
+FILLER = ["und", "in", "diesem", "Jahre", "wurde", "die", "der", "das", "mit", "nach", "große",
+          "Feuer", "Kirche", "geweiht", "Bürger", "zogen", "gegen", "Frieden", "geschlossen",
+          "Ernte", "reich", "Winter", "hart", "viele", "starben", "Rat", "beschloss"]
+
+
+def _names(rng: random.Random, n: int, taken: set) -> List[str]:
+    names = []
+    while len(names) < n:
+        name = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).capitalize()
+        if name not in taken:
+            taken.add(name)
+            names.append(name)
+    return names
+
+
+def make_annals(years: int, entities: int, chars_per_year: int, seed: int = 1) -> Tuple[str, Dict[str, List[str]]]:
+    """
+    Annalentext mit `years` Jahresabschnitten (ab 1100) und einem Vorrat von
+    `entities` Personen und ebenso vielen Orten. Liefert (text, vorrat).
+    """
+    rng = random.Random(seed)
+    taken: set = set()
+    persons = [f"{rng.choice(TITLES)} {n}" for n in _names(rng, max(1, entities), taken)]
+    places = _names(rng, max(1, entities), taken)
+
+    def sentence() -> str:
+        words = [rng.choice(FILLER) for _ in range(rng.randint(6, 12))]
+        roll = rng.random()
+        if roll < 0.35:
+            words.insert(rng.randrange(len(words)), rng.choice(persons))
+        if roll > 0.25:
+            words.insert(rng.randrange(len(words)), f"zu {rng.choice(places)}")
+        if rng.random() < 0.3:
+            words.insert(rng.randrange(len(words)), f"{rng.choice(PLACE_HINTS)} {rng.choice(places)}")
+        if rng.random() < 0.3:
+            words.append(rng.choice(KEYWORDS))
+        text = " ".join(words)
+        return text[0].upper() + text[1:] + "."
+
+    sections = []
+    for year in range(1100, 1100 + years):
+        body: List[str] = []
+        size = 0
+        while size < chars_per_year:
+            s = sentence()
+            body.append(s)
+            size += len(s) + 1
+        sections.append(f"{year}.\n" + "\n".join(textwrap.wrap(" ".join(body), 80)))
+    return "\n\n".join(sections), {"personen": persons, "orte": places}
+
+
+def split_pages(text: str, pages: int) -> List[str]:
+    """Text zeilenweise auf `pages` etwa gleich lange Seiten verteilen."""
+    lines = text.split("\n")
+    per_page = max(1, -(-len(lines) // max(1, pages)))
+    chunks = ["\n".join(lines[i:i + per_page]) for i in range(0, len(lines), per_page)]
+    return chunks + [""] * (pages - len(chunks))
+
+
+def render_page(text: str, dpi: int = 200, font_pt: int = 11) -> Image.Image:
+    """Eine A4-Seite mit dem Text in Schwarz auf Weiß, Ränder 2 cm."""
+    width, height = int(8.27 * dpi), int(11.69 * dpi)
+    margin = int(0.8 * dpi)
+    size = max(8, int(font_pt * dpi / 72))
+    img = Image.new("L", (width, height), 255)
+    draw = ImageDraw.Draw(img)
+    font = ImageFont.load_default(size=size)
+    y = margin
+    for line in text.split("\n"):
+        if y > height - margin:
+            break
+        draw.text((margin, y), line, fill=0, font=font)
+        y += int(size * 1.4)
+    img.info["dpi"] = (dpi, dpi)
+    return img
+
+
+def render_pages(page_texts: List[str], dpi: int = 200) -> List[Image.Image]:
+    return [render_page(t, dpi=dpi) for t in page_texts]
+
+
+def make_pdf(images: List[Image.Image], dpi: int = 200) -> bytes:
+    buf = io.BytesIO()
+    images[0].save(buf, "PDF", save_all=True, append_images=images[1:], resolution=dpi)
+    return buf.getvalue()
@@ -0,0 +1,231 @@
+# benchmarks/run.py
+"""
+Benchmark-Suite: erzeugt ein synthetisches Annalen-Korpus (benchmarks/corpus.py),
+misst jede Stufe aus app.py einzeln sowie die ganze Pipeline und schreibt die
+Ergebnisse als JSON – zum Vergleichen zweier Läufe mit benchmarks/compare.py.
+
+    python benchmarks/run.py --years 200 --entities 300 --pages 20 --out before.json
+    python benchmarks/run.py --years 200 --entities 300 --pages 20 --out after.json
+    python benchmarks/compare.py before.json after.json
+
+Tesseract: --tesseract stub ersetzt ocr_image durch eine Attrappe, die den
+Seitentext zurückgibt (optional mit --stub-ms künstlicher Dauer); real nutzt
+das installierte Tesseract; auto (Standard) nimmt real, wenn verfügbar.
+"""
+import argparse
+import atexit
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+# Alles, was app.py relativ zum Arbeitsverzeichnis ablegt, ins Temp-Verzeichnis
+# des Laufs – ein Benchmark aus dem Repo-Wurzelverzeichnis fasst cache/ nicht an.
+# OCR-Cache aus, damit Wiederholungen nicht aus dem Cache bedient werden.
+WORK = Path(tempfile.mkdtemp(prefix="ocr-bench-"))
+atexit.register(shutil.rmtree, WORK, ignore_errors=True)
+os.environ.setdefault("OCR_CACHE_MAX_MB", "0")
+os.environ["OCR_CACHE_DIR"] = str(WORK / "cache" / "ocr")
+os.environ["PROGRESS_DB"] = str(WORK / "cache" / "progress.sqlite3")
+
+import app  # noqa: E402
+import corpus  # noqa: E402
+
+STAGES = ("rasterize", "preprocess", "ocr", "split", "entities", "annotate", "register", "zip", "pipeline")
+LINES_PER_PAGE = 45
+
+
+class StubOCR:
+    """
+    Ersatz für app.ocr_image: liefert die Seitentexte in Aufrufreihenfolge.
+    Setzt serielle OCR voraus (OCR_WORKERS=1, Cache aus).
+    """
+
+    def __init__(self, page_texts: List[str], delay_ms: float = 0.0):
+        self.page_texts = page_texts
+        self.delay = delay_ms / 1000.0
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def reset(self) -> None:
+        self.calls = 0
+
+    def __call__(self, img, lang: str) -> str:
+        with self.lock:
+            idx = self.calls % len(self.page_texts)
+            self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        return self.page_texts[idx]
+
+
+def tesseract_available() -> bool:
+    try:
+        app.pytesseract.get_tesseract_version()
+        return True
+    except Exception:
+        return False
+
+
+def git_revision() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True)
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def measure(fn: Callable[[], object], repeat: int, setup: Optional[Callable[[], None]] = None) -> dict:
+    runs = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        t0 = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - t0)
+    return {
+        "runs": [round(r, 6) for r in runs],
+        "min": round(min(runs), 6),
+        "median": round(statistics.median(runs), 6),
+        "mean": round(statistics.fmean(runs), 6),
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--years", type=int, default=100, help="Jahresabschnitte im Korpus")
+    ap.add_argument("--entities", type=int, default=200, help="Personen (und ebenso viele Orte) im Vorrat")
+    ap.add_argument("--chars-per-year", type=int, default=600)
+    ap.add_argument("--pages", type=int, default=0, help="Seitenzahl (0 = aus der Textlänge)")
+    ap.add_argument("--dpi", type=int, default=200, help="Auflösung der gerenderten Seiten")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--repeat", type=int, default=3, help="Wiederholungen je Stufe")
+    ap.add_argument("--stages", default=",".join(STAGES), help=f"Auswahl aus {','.join(STAGES)}")
+    ap.add_argument("--tesseract", choices=("auto", "stub", "real"), default="auto")
+    ap.add_argument("--stub-ms", type=float, default=0.0, help="künstliche OCR-Dauer je Seite (stub)")
+    ap.add_argument("--preprocess", choices=app.PREPROCESS_MODES, default="gray")
+    ap.add_argument("--out", type=Path, help="JSON-Ergebnis (Standard: benchmarks/results/<zeitstempel>.json)")
+    args = ap.parse_args()
+
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        ap.error(f"unbekannte Stufe(n): {', '.join(sorted(unknown))}")
+
+    mode = args.tesseract
+    if mode == "auto":
+        mode = "real" if tesseract_available() else "stub"
+    elif mode == "real" and not tesseract_available():
+        ap.error("Tesseract nicht gefunden (TESSERACT_CMD setzen oder --tesseract stub)")
+
+    # Korpus
+    text, _ = corpus.make_annals(args.years, args.entities, args.chars_per_year, args.seed)
+    pages = args.pages or max(1, -(-text.count("\n") // LINES_PER_PAGE))
+    page_texts = corpus.split_pages(text, pages)
+    images = corpus.render_pages(page_texts, dpi=args.dpi)
+    pdf_bytes = corpus.make_pdf(images, dpi=args.dpi)
+    lang = app.tesseract_lang("deu")
+    print(f"Korpus: {args.years} Jahre, {len(text)} Zeichen, {pages} Seiten, PDF {len(pdf_bytes) // 1024} KiB, "
+          f"OCR: {mode}")
+
+    stub = None
+    if mode == "stub":
+        stub = StubOCR(page_texts, args.stub_ms)
+        app.ocr_image = stub
+        app.OCR_WORKERS = 1
+
+    results: Dict[str, dict] = {}
+    work = WORK
+    try:
+        pdf = work / "bench.pdf"
+        pdf.write_bytes(pdf_bytes)
+        # Zwischenergebnisse, damit jede Stufe isoliert auf festen Eingaben läuft
+        year_map = app.split_annals_by_year(text)
+        sections = list(year_map.items())
+        entities = list(app.detect_entities_batch(t for _, t in sections))
+        annotated = [app.annotate_text_with_links(t, "../../register", e) for (_, t), e in zip(sections, entities)]
+
+        def run_register():
+            register = app.RegisterBuilder()
+            for (y, _), (_, used) in zip(sections, annotated):
+                register.add(used, mention_info=(f"jahre/{y}/README.md", f"../jahre/{y}/README.md", y))
+            register.write(work / "register-out")
+
+        def run_pipeline():
+            # Werkordner, ZIP und globaler Register-Index landen im Temp-Verzeichnis, nicht in output/
+            return app._run_ocr_pipeline(pdf, "bench.pdf", "deu", "annals", "bench", job_id="bench",
+                                         preprocess=args.preprocess, out_root=work, zip_dir=work)
+
+        cases = {
+            # wie in der Pipeline mit 300 dpi, unabhängig von --dpi der gerenderten Vorlage
+            "rasterize": (lambda: sum(1 for _ in app.iter_pdf_pages(pdf)), None),
+            "preprocess": (lambda: [app.preprocess_image(img, args.preprocess) for img in images], None),
+            "ocr": (lambda: app.ocr_pages(enumerate(images), lang=lang, preprocess=args.preprocess),
+                    stub.reset if stub else None),
+            "split": (lambda: app.split_annals_by_year(text), None),
+            "entities": (lambda: list(app.detect_entities_batch(t for _, t in sections)), None),
+            "annotate": (lambda: [app.annotate_text_with_links(t, "../../register", e)
+                                  for (_, t), e in zip(sections, entities)], None),
+            "register": (run_register, lambda: shutil.rmtree(work / "register-out", ignore_errors=True)),
+            "zip": (lambda: app.make_zip_of_folder(work / "register-out", work / "register.zip"), None),
+        }
+        for stage in stages:
+            if stage == "pipeline":
+                continue
+            fn, setup = cases[stage]
+            if stage == "zip" and not (work / "register-out").exists():
+                run_register()  # Eingabe für das ZIP
+            results[stage] = measure(fn, args.repeat, setup)
+            print(f"{stage:<11}{results[stage]['median']:10.4f} s (Median aus {args.repeat})")
+
+        if "pipeline" in stages:
+            timings = []
+
+            def pipeline_once():
+                timings.append(run_pipeline()["timings"])
+
+            results["pipeline"] = measure(pipeline_once, args.repeat, stub.reset if stub else None)
+            # Stufenzeiten des Laufs mit dem Median der Gesamtdauer
+            median_run = sorted(range(len(timings)), key=lambda i: results["pipeline"]["runs"][i])[len(timings) // 2]
+            results["pipeline"]["timings"] = timings[median_run]
+            print(f"{'pipeline':<11}{results['pipeline']['median']:10.4f} s (Median aus {args.repeat})")
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "git": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "ocr": mode,
+            "stub_ms": args.stub_ms if mode == "stub" else None,
+            "spacy": app._get_spacy_nlp() is not None,
+            "pdf_backend": app._pdf_backend(),
+            "params": {k: vars(args)[k] for k in ("years", "entities", "chars_per_year", "dpi", "seed",
+                                                   "repeat", "preprocess")} | {"pages": pages},
+            "corpus": {"chars": len(text), "sections": len(sections)},
+        },
+        "stages": results,
+    }
+    out = args.out or Path(__file__).resolve().parent / "results" / f"{datetime.now():%Y%m%d-%H%M%S}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"Ergebnis: {out}")
+
+
+if __name__ == "__main__":
+    main()